@@ -2,8 +2,10 @@ import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from flask_migrate import Migrate
 
 db = SQLAlchemy()
+migrate = Migrate()
 login_manager = LoginManager()
 
 
@@ -16,9 +18,16 @@ def create_app(config_name=None):
 
     from config import config as cfg_map
     app.config.from_object(cfg_map.get(config_name, cfg_map['default']))
+    app.config['CONFIG_NAME'] = config_name
 
     # ---------- Database ----------
     db.init_app(app)
+    migrate.init_app(app, db, render_as_batch=True,
+                     directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
+
+    # ---------- Query counting ----------
+    from app.utils.query_guard import init_query_guard
+    init_query_guard(app)
 
     # ---------- Login manager ----------
     login_manager.init_app(app)
@@ -46,18 +55,39 @@ def create_app(config_name=None):
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(auth_bp, url_prefix='/auth')
 
-    # ---------- Create tables & seed admin user ----------
+    # ---------- CLI commands ----------
+    from app.cli import register_commands
+    register_commands(app)
+
+    # ---------- Migrate schema & seed admin user ----------
     with app.app_context():
         from app import models  # noqa: F401
-        db.create_all()
+        _upgrade_schema()
         _seed_defaults()
 
+        from app.utils import catalog
+        catalog.get()
+
     return app
 
 
+def _upgrade_schema():
+    """Apply pending migrations from migrations/.
+
+    Databases made by ``db.create_all()`` before migrations existed have
+    tables but no alembic_version; they are stamped at the initial
+    revision and brought up to date from there.
+    """
+    from flask_migrate import stamp, upgrade
+    tables = db.inspect(db.engine).get_table_names()
+    if 'users' in tables and 'alembic_version' not in tables:
+        stamp(revision='0001')
+    upgrade()
+
+
 def _seed_defaults():
     """Create admin user and default data if they don't exist yet."""
-    from app.models import User, Brand, Variant, Size, Product, Inventory
+    from app.models import User, Brand, Variant, Size, Product, Inventory, StatCounter
 
     # Admin user
     if not User.query.filter_by(username='admin').first():
@@ -103,3 +133,8 @@ def _seed_defaults():
                     db.session.flush()
                     db.session.add(Inventory(product_id=product.id, quantity=0, reorder_level=10))
         db.session.commit()
+
+    # Dashboard counters (first run, or upgrading an existing database)
+    if not StatCounter.query.first():
+        from app.utils.counters import reconcile
+        reconcile()
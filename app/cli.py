@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+
+import click
+
+
+def register_commands(app):
+    """Attach maintenance commands to ``flask``."""
+
+    @app.cli.command('reconcile-stats')
+    @click.option('--dry-run', is_flag=True, help='Report drift without fixing it.')
+    def reconcile_stats(dry_run):
+        """Recompute dashboard counters from scratch and report drift."""
+        from app.utils.counters import reconcile
+        drift = reconcile(fix=not dry_run)
+        if not drift:
+            click.echo('Counters OK')
+            return
+        for key, (stored, expected) in sorted(drift.items()):
+            click.echo(f'{key}: stored={stored} expected={expected}')
+        click.echo(f"{len(drift)} counter(s) drifted{'' if dry_run else ' (fixed)'}")
+
+    @app.cli.command('backfill-sales')
+    @click.option('--from', 'start', metavar='YYYY-MM-DD', help='First day (default: the earliest).')
+    @click.option('--to', 'end', metavar='YYYY-MM-DD', help='Last day (default: the latest).')
+    @click.option('--dry-run', is_flag=True, help='Report rows that differ without rebuilding.')
+    def backfill_sales(start, end, dry_run):
+        """Rebuild the sales_daily rollup from invoice lines."""
+        from app.utils import sales
+        from app.utils.pagination import parse_date_range
+        try:
+            start, end = parse_date_range({'from': start, 'to': end})
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        if not dry_run:
+            click.echo(f'{sales.rebuild(start, end)} rollup row(s) written')
+            return
+        drift = sales.drift(start, end)
+        for (day, product_id, customer_id), (stored, expected) in sorted(drift.items()):
+            click.echo(f'{day} {product_id} {customer_id}: stored={stored} expected={expected}')
+        click.echo(f'{len(drift)} rollup row(s) differ' if drift else 'Rollup OK')
+
+    @app.cli.command('run-jobs')
+    @click.option('--workers', default=1, show_default=True, help='Worker processes to run.')
+    @click.option('--once', is_flag=True, help='Exit once the queue is empty.')
+    def run_jobs(workers, once):
+        """Run queued background jobs (PDFs, exports, CSV imports)."""
+        from app.utils import jobs
+        if workers <= 1:
+            signal.signal(signal.SIGTERM, jobs.stop)
+            signal.signal(signal.SIGINT, jobs.stop)
+            jobs.work(once=once)
+            return
+
+        # spawn: children must not inherit the parent's DB connections
+        ctx = multiprocessing.get_context('spawn')
+        procs = [ctx.Process(target=jobs.worker_main,
+                             args=(app.config.get('CONFIG_NAME'), once))
+                 for _ in range(workers)]
+        for proc in procs:
+            proc.start()
+        click.echo(f'Started {workers} job workers')
+        try:
+            for proc in procs:
+                proc.join()
+        except KeyboardInterrupt:
+            # Children got the SIGINT too and finish their current job
+            for proc in procs:
+                proc.join()
+
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', '-v', is_flag=True, help='Print every plan.')
+    def check_query_plans(verbose):
+        """EXPLAIN the hot queries; fail if one scans a whole table."""
+        from app.utils.query_plans import check
+        failed = 0
+        for name, lines, scanned in check():
+            if scanned:
+                failed += 1
+            click.echo(f"{'FULL SCAN' if scanned else 'ok':<9} {name}"
+                       + (f" ({', '.join(scanned)})" if scanned else ''))
+            if verbose or scanned:
+                for line in lines:
+                    click.echo(f'          {line}')
+        if failed:
+            raise click.ClickException(f'{failed} hot query(s) fall back to a full scan')
@@ -1,8 +1,10 @@
+import json
 import uuid
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import db
+from app.utils.money import as_float
 
 
 def gen_uuid():
@@ -102,6 +104,10 @@ class Size(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_brand_id_is_active', 'brand_id', 'is_active'),
+        db.Index('ix_products_is_active', 'is_active'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     name = db.Column(db.String(200), nullable=False)
@@ -110,26 +116,37 @@ class Product(db.Model):
     size_id = db.Column(db.String(36), db.ForeignKey('sizes.id'), nullable=False)
     hsn_code = db.Column(db.String(20), default='3917')
     unit = db.Column(db.String(20), default='Nos')
-    price = db.Column(db.Float, default=0.0)
+    price = db.Column(db.Numeric(12, 2), default=0)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     inventory = db.relationship('Inventory', backref='product', uselist=False, lazy=True)
 
-    def to_dict(self):
+    def to_dict(self, snapshot=None):
+        # With a catalog snapshot (app.utils.catalog) brand/variant/size
+        # are read from it rather than loaded; rows newer than the
+        # snapshot, or no snapshot, fall back to the relationships.
+        brand = variant = size = None
+        if snapshot is not None:
+            brand = snapshot.brands.get(self.brand_id)
+            variant = snapshot.variants.get(self.variant_id)
+            size = snapshot.sizes.get(self.size_id)
+        brand = brand or self.brand
+        variant = variant or self.variant
+        size = size or self.size
         return {
             'id': self.id,
             'name': self.name,
             'brand_id': self.brand_id,
             'variant_id': self.variant_id,
             'size_id': self.size_id,
-            'brand': self.brand.to_dict() if self.brand else None,
-            'variant': self.variant.to_dict() if self.variant else None,
-            'size': self.size.to_dict() if self.size else None,
+            'brand': brand.to_dict() if brand else None,
+            'variant': variant.to_dict() if variant else None,
+            'size': size.to_dict() if size else None,
             'hsn_code': self.hsn_code,
             'unit': self.unit,
-            'price': self.price,
+            'price': as_float(self.price),
             'is_active': self.is_active,
             'inventory': self.inventory.to_dict() if self.inventory else None,
         }
@@ -144,6 +161,7 @@ class Inventory(db.Model):
     product_id = db.Column(db.String(36), db.ForeignKey('products.id'), unique=True, nullable=False)
     quantity = db.Column(db.Integer, default=0)
     reorder_level = db.Column(db.Integer, default=10)
+    reserved = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     def to_dict(self):
         return {
@@ -151,6 +169,7 @@ class Inventory(db.Model):
             'product_id': self.product_id,
             'quantity': self.quantity,
             'reorder_level': self.reorder_level,
+            'reserved': self.reserved or 0,
         }
 
 
@@ -191,43 +210,65 @@ class Customer(db.Model):
 
 class Invoice(db.Model):
     __tablename__ = 'invoices'
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        db.Index('ix_invoices_created_at_id', 'created_at', 'id'),
+        db.Index('ix_invoices_invoice_date', 'invoice_date'),
+        db.Index('ix_invoices_customer_id_created_at_id', 'customer_id', 'created_at', 'id'),
+        db.Index('ix_invoices_status_created_at_id', 'status', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     invoice_number = db.Column(db.String(50), unique=True, nullable=False)
     customer_id = db.Column(db.String(36), db.ForeignKey('customers.id'), nullable=False)
     invoice_date = db.Column(db.DateTime, default=datetime.utcnow)
-    subtotal = db.Column(db.Float, default=0.0)
-    cgst_total = db.Column(db.Float, default=0.0)
-    sgst_total = db.Column(db.Float, default=0.0)
-    grand_total = db.Column(db.Float, default=0.0)
+    subtotal = db.Column(db.Numeric(12, 2), default=0)
+    cgst_total = db.Column(db.Numeric(12, 2), default=0)
+    sgst_total = db.Column(db.Numeric(12, 2), default=0)
+    igst_total = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')
+    grand_total = db.Column(db.Numeric(12, 2), default=0)
     status = db.Column(db.String(20), default='draft')  # draft, sent, paid, cancelled
+    # Effect on inventory: none, reserved, committed; NULL for invoices
+    # created before stock tracking, which are never adjusted.
+    stock_state = db.Column(db.String(20), nullable=True)
+    # GST state code the supply is made to; NULL for invoices made before
+    # IGST support, which are all intra-state.
+    place_of_supply = db.Column(db.String(2), nullable=True)
     notes = db.Column(db.Text, default='')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     items = db.relationship('InvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_items=True):
+        data = {
             'id': self.id,
             'invoice_number': self.invoice_number,
             'customer_id': self.customer_id,
             'customer': self.customer.to_dict() if self.customer else None,
             'invoice_date': self.invoice_date.isoformat() if self.invoice_date else None,
-            'subtotal': self.subtotal,
-            'cgst_total': self.cgst_total,
-            'sgst_total': self.sgst_total,
-            'grand_total': self.grand_total,
+            'subtotal': as_float(self.subtotal),
+            'cgst_total': as_float(self.cgst_total),
+            'sgst_total': as_float(self.sgst_total),
+            'igst_total': as_float(self.igst_total),
+            'grand_total': as_float(self.grand_total),
             'status': self.status,
+            'place_of_supply': self.place_of_supply,
             'notes': self.notes,
-            'items': [item.to_dict() for item in self.items],
             'created_at': self.created_at.isoformat() if self.created_at else None,
         }
+        if include_items:
+            data['items'] = [item.to_dict() for item in self.items]
+        return data
 
 
 # ──────────────────────────────── InvoiceItem ────────────────────────────────
 
 class InvoiceItem(db.Model):
     __tablename__ = 'invoice_items'
+    __table_args__ = (
+        db.Index('ix_invoice_items_invoice_id', 'invoice_id'),
+        db.Index('ix_invoice_items_product_id', 'product_id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     invoice_id = db.Column(db.String(36), db.ForeignKey('invoices.id'), nullable=False)
@@ -235,12 +276,14 @@ class InvoiceItem(db.Model):
     product_name = db.Column(db.String(200), default='')
     hsn_code = db.Column(db.String(20), default='3917')
     quantity = db.Column(db.Integer, default=1)
-    unit_price = db.Column(db.Float, default=0.0)
-    discount_percent = db.Column(db.Float, default=0.0)
-    taxable_amount = db.Column(db.Float, default=0.0)
-    cgst_amount = db.Column(db.Float, default=0.0)
-    sgst_amount = db.Column(db.Float, default=0.0)
-    total = db.Column(db.Float, default=0.0)
+    unit_price = db.Column(db.Numeric(12, 2), default=0)
+    discount_percent = db.Column(db.Numeric(5, 2), default=0)
+    gst_rate = db.Column(db.Numeric(5, 2), nullable=True)  # total GST %
+    taxable_amount = db.Column(db.Numeric(12, 2), default=0)
+    cgst_amount = db.Column(db.Numeric(12, 2), default=0)
+    sgst_amount = db.Column(db.Numeric(12, 2), default=0)
+    igst_amount = db.Column(db.Numeric(12, 2), nullable=False, default=0, server_default='0')
+    total = db.Column(db.Numeric(12, 2), default=0)
 
     product = db.relationship('Product', lazy=True)
 
@@ -252,10 +295,130 @@ class InvoiceItem(db.Model):
             'product_name': self.product_name,
             'hsn_code': self.hsn_code,
             'quantity': self.quantity,
-            'unit_price': self.unit_price,
-            'discount_percent': self.discount_percent,
-            'taxable_amount': self.taxable_amount,
-            'cgst_amount': self.cgst_amount,
-            'sgst_amount': self.sgst_amount,
+            'unit_price': as_float(self.unit_price),
+            'discount_percent': as_float(self.discount_percent),
+            'gst_rate': as_float(self.gst_rate),
+            'taxable_amount': as_float(self.taxable_amount),
+            'cgst_amount': as_float(self.cgst_amount),
+            'sgst_amount': as_float(self.sgst_amount),
+            'igst_amount': as_float(self.igst_amount),
+            'total': as_float(self.total),
+        }
+
+
+# ──────────────────────────────── StatCounter ────────────────────────────────
+
+class StatCounter(db.Model):
+    """Materialized dashboard counter, maintained by app.utils.counters.
+
+    A counter's value is the sum over its ``slot`` rows; writers add to a
+    random slot so concurrent transactions rarely wait on the same row.
+    """
+    __tablename__ = 'stat_counters'
+
+    key = db.Column(db.String(80), primary_key=True)
+    slot = db.Column(db.Integer, primary_key=True, default=0, server_default='0')
+    value = db.Column(db.Numeric(16, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ──────────────────────────────── InvoiceSequence ────────────────────────────
+
+class InvoiceSequence(db.Model):
+    """Last invoice serial issued per day, see app.utils.invoice_numbers."""
+    __tablename__ = 'invoice_sequences'
+
+    day = db.Column(db.String(8), primary_key=True)  # YYYYMMDD
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ──────────────────────────────── Job ────────────────────────────────────────
+
+class Job(db.Model):
+    """Background job run by ``flask run-jobs``, see app.utils.jobs."""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
+    kind = db.Column(db.String(40), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(80), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        result = json.loads(self.result) if self.result else None
+        if result and 'file' in result:
+            # Files are fetched from /api/jobs/<id>/result
+            result = {k: v for k, v in result.items() if k != 'file'}
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
             'total': self.total,
+            'result': result,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# ──────────────────────────────── TableVersion ───────────────────────────────
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped by writes; see app.utils.versions."""
+    __tablename__ = 'table_versions'
+
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+# ──────────────────────────────── HsnRate ────────────────────────────────────
+
+class HsnRate(db.Model):
+    """GST rate per HSN code, see app.utils.tax."""
+    __tablename__ = 'hsn_rates'
+
+    hsn_code = db.Column(db.String(20), primary_key=True)
+    rate = db.Column(db.Numeric(5, 2), nullable=False)  # total GST %
+    description = db.Column(db.String(200), default='')
+
+    def to_dict(self):
+        return {
+            'hsn_code': self.hsn_code,
+            'rate': as_float(self.rate),
+            'description': self.description,
         }
+
+
+# ──────────────────────────────── SalesDaily ─────────────────────────────────
+
+class SalesDaily(db.Model):
+    """Invoice lines summed per day, product and customer; see app.utils.sales.
+
+    Cancelled invoices are not included. ``brand_id`` is the product's
+    brand, copied so brand trends need no join. Like StatCounter, each
+    (day, product, customer) is spread over ``slot`` rows to be summed.
+    """
+    __tablename__ = 'sales_daily'
+
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.String(36), primary_key=True)
+    customer_id = db.Column(db.String(36), primary_key=True)
+    slot = db.Column(db.Integer, primary_key=True, default=0, server_default='0')
+    brand_id = db.Column(db.String(36), nullable=False)
+    lines = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    taxable = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    tax = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
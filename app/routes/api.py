@@ -1,25 +1,62 @@
 import csv
-import io
-from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import (
+    Blueprint, request, jsonify, send_file, current_app, Response, url_for,
+    stream_with_context,
+)
 from flask_login import login_required
 from app import db
 from app.models import (
-    Brand, Variant, Size, Product, Inventory,
-    Customer, Invoice, InvoiceItem,
+    Brand, Product, Inventory,
+    Customer, Invoice, InvoiceItem, Job, HsnRate, gen_uuid,
 )
 from app.utils.pdf_generator import generate_invoice_pdf
+from app.utils.pagination import page_size, page_offset
+from app.utils.queries import (
+    product_query, inventory_query, invoice_query, filter_invoices,
+)
+from app.utils.query_guard import query_budget
+from app.utils import counters
+from app.utils.inventory_import import open_csv, import_inventory
+from app.utils import catalog
+from app.utils.invoicing import (
+    parse_items, check_products, fill_hsn, assign_rates, apply_amounts, invoice_totals,
+    item_rows,
+)
+from app.utils import tax
+from app.utils.money import to_decimal, as_float
+from app.utils.invoice_numbers import allocate_invoice_numbers
+from app.utils import stock
+from app.utils import pdf_cache
+from app.utils import pdf_export
+from app.utils import jobs
+from app.utils import inventory_search
+from app.utils.inventory_search import filter_inventory
+from app.utils import columnar
+from app.utils.columnar import wants_columnar
+from app.utils import fast_json
+from app.utils import versions
+from app.utils import gst_report
+from app.utils import sales
+from app.utils import exports
 
 api_bp = Blueprint('api', __name__)
 
+MAX_BATCH_INVOICES = 1000
+
+# Tables /api/products is built from (Product.to_dict() includes inventory)
+PRODUCT_TABLES = ('products', 'brands', 'variants', 'sizes', 'inventory')
+
 
 # ─────────────────────────── Brands ──────────────────────────────────────────
 
 @api_bp.route('/brands', methods=['GET'])
 @login_required
 def get_brands():
-    brands = Brand.query.all()
-    return jsonify([b.to_dict() for b in brands])
+    return versions.cached_json('brands', ('brands',),
+                                lambda: [b.to_dict() for b in Brand.query.all()])
 
 
 @api_bp.route('/brands', methods=['POST'])
@@ -38,6 +75,7 @@ def create_brand():
         description=data.get('description', ''),
     )
     db.session.add(brand)
+    versions.bump('brands')
     db.session.commit()
 
     # Auto-create products for this brand
@@ -66,6 +104,7 @@ def update_brand(brand_id):
         brand.description = data['description']
     if 'is_active' in data:
         brand.is_active = data['is_active']
+    versions.bump('brands')
     db.session.commit()
     return jsonify(brand.to_dict())
 
@@ -75,6 +114,7 @@ def update_brand(brand_id):
 def delete_brand(brand_id):
     brand = Brand.query.get_or_404(brand_id)
     db.session.delete(brand)
+    versions.bump('brands')
     db.session.commit()
     return jsonify({'message': 'Brand deleted'})
 
@@ -83,9 +123,11 @@ def delete_brand(brand_id):
 
 @api_bp.route('/products', methods=['GET'])
 @login_required
+@query_budget(2)
 def get_products():
-    products = Product.query.filter_by(is_active=True).all()
-    return jsonify([p.to_dict() for p in products])
+    if wants_columnar(request):
+        return versions.cached_json('products:columnar', PRODUCT_TABLES, columnar.products)
+    return versions.cached_json('products', PRODUCT_TABLES, fast_json.products)
 
 
 @api_bp.route('/products', methods=['POST'])
@@ -103,50 +145,76 @@ def create_product():
         size_id=data['size_id'],
         hsn_code=data.get('hsn_code', '3917'),
         unit=data.get('unit', 'Nos'),
-        price=float(data.get('price', 0)),
+        price=to_decimal(data.get('price', 0)),
     )
     db.session.add(product)
     db.session.flush()
 
     inv = Inventory(product_id=product.id, quantity=0, reorder_level=10)
     db.session.add(inv)
+    versions.bump('products', 'inventory')
     db.session.commit()
-    return jsonify(product.to_dict()), 201
+    return jsonify(product.to_dict(catalog.get())), 201
 
 
 @api_bp.route('/products/<product_id>', methods=['GET'])
 @login_required
 def get_product(product_id):
-    product = Product.query.get_or_404(product_id)
-    return jsonify(product.to_dict())
+    product = product_query().get_or_404(product_id)
+    return jsonify(product.to_dict(catalog.get()))
 
 
 @api_bp.route('/products/<product_id>', methods=['PUT'])
 @login_required
 def update_product(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = product_query().get_or_404(product_id)
     data = request.get_json()
+    before = counters.stock_contribution(product, product.inventory)
     for key in ('name', 'hsn_code', 'unit', 'is_active'):
         if key in data:
             setattr(product, key, data[key])
     if 'price' in data:
-        product.price = float(data['price'])
+        product.price = to_decimal(data['price'])
+    counters.bump(counters.diff(before, counters.stock_contribution(product, product.inventory)))
+    versions.bump('products')
     db.session.commit()
-    return jsonify(product.to_dict())
+    return jsonify(product.to_dict(catalog.get()))
 
 
 # ─────────────────────────── Inventory ───────────────────────────────────────
 
 @api_bp.route('/inventory', methods=['GET'])
 @login_required
+@query_budget(2)
 def get_inventory():
-    items = db.session.query(Inventory, Product).join(Product).all()
-    result = []
-    for inv, prod in items:
-        d = inv.to_dict()
+    """One page of inventory rows plus facet counts, filtered in SQL."""
+    try:
+        limit = page_size(request.args)
+        offset = page_offset(request.args)
+        if wants_columnar(request):
+            payload = columnar.inventory(request.args, limit, offset)
+        else:
+            rows = filter_inventory(inventory_query(), request.args).limit(limit).offset(offset).all()
+        facets, summary = inventory_search.facets(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if wants_columnar(request):
+        return fast_json.response({**payload, 'total': summary['products'], 'limit': limit,
+                                   'offset': offset, 'summary': summary, 'facets': facets})
+    items = []
+    for prod in rows:
+        d = prod.inventory.to_dict()
         d['product'] = prod.to_dict()
-        result.append(d)
-    return jsonify(result)
+        items.append(d)
+    return jsonify({
+        'items': items,
+        'total': summary['products'],
+        'limit': limit,
+        'offset': offset,
+        'summary': summary,
+        'facets': facets,
+    })
 
 
 @api_bp.route('/inventory/<product_id>', methods=['GET'])
@@ -160,10 +228,12 @@ def get_inventory_item(product_id):
 @login_required
 def update_inventory(product_id):
     try:
-        inv = Inventory.query.filter_by(product_id=product_id).first()
+        inv = Inventory.query.filter_by(product_id=product_id).with_for_update().first()
         if not inv:
-            inv = Inventory(product_id=product_id, quantity=0)
+            inv = Inventory(product_id=product_id, quantity=0, reorder_level=10)
             db.session.add(inv)
+        product = db.session.get(Product, product_id)
+        before = counters.stock_contribution(product, inv)
 
         data = request.get_json()
         if not data:
@@ -172,8 +242,17 @@ def update_inventory(product_id):
             inv.quantity = int(data['quantity'])
         if 'reorder_level' in data:
             inv.reorder_level = int(data['reorder_level'])
+        counters.bump(counters.diff(before, counters.stock_contribution(product, inv)))
+        if 'adjust' in data:
+            # Relative change, applied atomically in SQL
+            db.session.flush()
+            stock.adjust({product_id: int(data['adjust'])})
+        versions.bump('inventory')
         db.session.commit()
         return jsonify(inv.to_dict())
+    except stock.InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'products': e.products}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -189,21 +268,17 @@ def upload_inventory():
     if not file.filename.endswith('.csv'):
         return jsonify({'error': 'Only CSV files are accepted'}), 400
 
+    if _wants_async():
+        name = jobs.save_input(file.stream, '.csv')
+        return _accepted(jobs.enqueue('inventory_import', file=name))
+
     try:
-        stream = io.StringIO(file.stream.read().decode('utf-8'))
-        reader = csv.DictReader(stream)
-        updated = 0
-        for row in reader:
-            pid = row.get('product_id', '').strip()
-            qty = row.get('quantity', '0').strip()
-            if not pid:
-                continue
-            inv = Inventory.query.filter_by(product_id=pid).first()
-            if inv:
-                inv.quantity = int(qty)
-                updated += 1
+        result = import_inventory(open_csv(file.stream))
         db.session.commit()
-        return jsonify({'message': f'{updated} items updated'})
+        return jsonify(result.to_dict())
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -214,8 +289,9 @@ def upload_inventory():
 @api_bp.route('/customers', methods=['GET'])
 @login_required
 def get_customers():
-    custs = Customer.query.order_by(Customer.name).all()
-    return jsonify([c.to_dict() for c in custs])
+    return versions.cached_json(
+        'customers', ('customers',),
+        lambda: [c.to_dict() for c in Customer.query.order_by(Customer.name)])
 
 
 @api_bp.route('/customers', methods=['POST'])
@@ -236,6 +312,7 @@ def create_customer():
         pincode=data.get('pincode', ''),
     )
     db.session.add(customer)
+    versions.bump('customers')
     db.session.commit()
     return jsonify(customer.to_dict()), 201
 
@@ -248,6 +325,7 @@ def update_customer(customer_id):
     for key in ('name', 'gstin', 'phone', 'email', 'address', 'city', 'state', 'pincode'):
         if key in data:
             setattr(customer, key, data[key])
+    versions.bump('customers')
     db.session.commit()
     return jsonify(customer.to_dict())
 
@@ -257,17 +335,83 @@ def update_customer(customer_id):
 def delete_customer(customer_id):
     customer = Customer.query.get_or_404(customer_id)
     db.session.delete(customer)
+    versions.bump('customers')
     db.session.commit()
     return jsonify({'message': 'Customer deleted'})
 
 
+# ─────────────────────────── Tax rates ───────────────────────────────────────
+
+@api_bp.route('/tax/rates', methods=['GET'])
+@login_required
+def get_tax_rates():
+    """HSN rate table plus what clients need to preview tax."""
+    default = current_app.config.get('DEFAULT_GST_RATE')
+    return jsonify({
+        'home_state': tax.HOME_STATE,
+        'default_rate': float(default) if default not in (None, '') else None,
+        'rates': [r.to_dict() for r in HsnRate.query.order_by(HsnRate.hsn_code)],
+        'states': tax.STATE_CODES,
+    })
+
+
+@api_bp.route('/tax/rates/<hsn_code>', methods=['PUT'])
+@login_required
+def put_tax_rate(hsn_code):
+    data = request.get_json() or {}
+    try:
+        rate = to_decimal(data.get('rate'))
+    except ValueError:
+        return jsonify({'error': 'rate must be a number'}), 400
+    if not 0 <= rate <= 100:
+        return jsonify({'error': 'rate must be between 0 and 100'}), 400
+
+    row = db.session.get(HsnRate, hsn_code)
+    if row is None:
+        row = HsnRate(hsn_code=hsn_code)
+        db.session.add(row)
+    row.rate = rate
+    if 'description' in data:
+        row.description = data['description']
+    versions.bump('hsn_rates')
+    db.session.commit()
+    return jsonify(row.to_dict())
+
+
+@api_bp.route('/tax/rates/<hsn_code>', methods=['DELETE'])
+@login_required
+def delete_tax_rate(hsn_code):
+    row = HsnRate.query.get_or_404(hsn_code)
+    db.session.delete(row)
+    versions.bump('hsn_rates')
+    db.session.commit()
+    return jsonify({'message': 'Rate deleted'})
+
+
 # ─────────────────────────── Invoices ────────────────────────────────────────
 
 @api_bp.route('/invoices', methods=['GET'])
 @login_required
+@query_budget(2)
 def get_invoices():
-    invoices = Invoice.query.order_by(Invoice.created_at.desc()).all()
-    return jsonify([inv.to_dict() for inv in invoices])
+    """Keyset-paginated invoice list, newest first.
+
+    Query params: limit, cursor, status, customer_id, customer (name
+    prefix), from, to, q (invoice number prefix) and view=summary|full.
+    """
+    args = request.args
+    try:
+        limit = page_size(args)
+        include_items = args.get('view', 'full') != 'summary'
+        if wants_columnar(request):
+            payload, next_cursor = columnar.invoices(args, limit, include_items)
+        else:
+            rows, next_cursor = fast_json.invoices(args, limit, include_items)
+            payload = {'invoices': rows}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return fast_json.response({**payload, 'next_cursor': next_cursor, 'limit': limit})
 
 
 @api_bp.route('/invoices', methods=['POST'])
@@ -276,86 +420,190 @@ def create_invoice():
     data = request.get_json()
     if not data or not data.get('customer_id') or not data.get('items'):
         return jsonify({'error': 'Customer and items are required'}), 400
-
-    # Generate invoice number
-    count = Invoice.query.count() + 1
-    inv_number = f"KVM-{datetime.utcnow().strftime('%Y%m%d')}-{count:04d}"
-
+    customer = db.session.get(Customer, data['customer_id'])
+    if customer is None:
+        return jsonify({'error': 'Customer not found'}), 400
+    place = tax.place_of_supply(customer.gstin, customer.state)
+    try:
+        items = parse_items(data['items'])
+        products = catalog.products_by_id(i['product_id'] for i in items)
+        check_products(items, products)
+        items = apply_amounts(fill_hsn(items, products), interstate=tax.is_interstate(place))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    now = datetime.utcnow()
     invoice = Invoice(
-        invoice_number=inv_number,
-        customer_id=data['customer_id'],
-        invoice_date=datetime.utcnow(),
+        id=gen_uuid(),
+        invoice_number=allocate_invoice_numbers(1, now)[0],
+        customer_id=customer.id,
+        invoice_date=now,
         notes=data.get('notes', ''),
         status='draft',
+        stock_state=stock.target_state('draft'),
+        place_of_supply=place,
+        **invoice_totals(items),
     )
     db.session.add(invoice)
-    db.session.flush()
-
-    subtotal = 0
-    cgst_total = 0
-    sgst_total = 0
-
-    for item_data in data['items']:
-        qty = int(item_data.get('quantity', 1))
-        price = float(item_data.get('unit_price', 0))
-        discount_pct = float(item_data.get('discount_percent', 0))
-
-        line_subtotal = qty * price
-        discount_amt = line_subtotal * discount_pct / 100
-        taxable = line_subtotal - discount_amt
-        cgst = round(taxable * 9 / 100, 2)
-        sgst = round(taxable * 9 / 100, 2)
-        total = round(taxable + cgst + sgst, 2)
-
-        product = Product.query.get(item_data['product_id'])
-        product_name = product.name if product else item_data.get('product_name', '')
-
-        item = InvoiceItem(
-            invoice_id=invoice.id,
-            product_id=item_data['product_id'],
-            product_name=product_name,
-            hsn_code=item_data.get('hsn_code', '3917'),
-            quantity=qty,
-            unit_price=price,
-            discount_percent=discount_pct,
-            taxable_amount=round(taxable, 2),
-            cgst_amount=cgst,
-            sgst_amount=sgst,
-            total=total,
-        )
-        db.session.add(item)
-
-        subtotal += round(taxable, 2)
-        cgst_total += cgst
-        sgst_total += sgst
-
-    invoice.subtotal = round(subtotal, 2)
-    invoice.cgst_total = round(cgst_total, 2)
-    invoice.sgst_total = round(sgst_total, 2)
-    invoice.grand_total = round(subtotal + cgst_total + sgst_total, 2)
+    rows = item_rows(invoice.id, items, products)
+    for row in rows:
+        db.session.add(InvoiceItem(**row))
 
+    try:
+        stock.transition(stock.quantities(items), stock.NONE, invoice.stock_state)
+    except stock.InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'products': e.products}), 409
+    counters.bump(counters.invoice_contribution(invoice))
+    sales.bump(sales.lines_contribution(now, customer.id, rows, products))
     db.session.commit()
     return jsonify(invoice.to_dict()), 201
 
 
+@api_bp.route('/invoices/batch', methods=['POST'])
+@login_required
+def create_invoices_batch():
+    """Create many invoices in one transaction.
+
+    Body: ``{"invoices": [{customer_id, items, notes}, ...], "atomic": false}``.
+    Invalid invoices are reported by index and skipped; with ``atomic``
+    any error rejects the whole batch.
+    """
+    data = request.get_json()
+    payloads = (data or {}).get('invoices')
+    if not payloads or not isinstance(payloads, list):
+        return jsonify({'error': 'invoices must be a non-empty list'}), 400
+    if len(payloads) > MAX_BATCH_INVOICES:
+        return jsonify({'error': f'At most {MAX_BATCH_INVOICES} invoices per batch'}), 400
+
+    customer_ids = {p.get('customer_id') for p in payloads if isinstance(p, dict)}
+    places = {c.id: tax.place_of_supply(c.gstin, c.state)
+              for c in db.session.query(Customer.id, Customer.gstin, Customer.state)
+              .filter(Customer.id.in_(customer_ids - {None}))}
+    rates = tax.rates()
+    product_ids = {i.get('product_id') for p in payloads if isinstance(p, dict)
+                   for i in (p.get('items') or []) if isinstance(i, dict)}
+    products = catalog.products_by_id(product_ids - {None})
+
+    errors, valid = [], []
+    for idx, payload in enumerate(payloads):
+        try:
+            if not isinstance(payload, dict):
+                raise ValueError('Invoice must be an object')
+            if payload.get('customer_id') not in places:
+                raise ValueError(f"Unknown customer_id {payload.get('customer_id')!r}")
+            items = check_products(parse_items(payload.get('items')), products)
+            assign_rates(fill_hsn(items, products), rates)
+        except (ValueError, AttributeError, TypeError) as e:
+            errors.append({'index': idx, 'error': str(e)})
+            continue
+        valid.append((idx, payload, items))
+
+    if errors and (data.get('atomic') or not valid):
+        return jsonify({'created': [], 'errors': errors}), 400
+
+    # One pass over every line of every invoice
+    apply_amounts([i for _, _, items in valid for i in items],
+                  interstate=[tax.is_interstate(places[p['customer_id']])
+                              for _, p, items in valid for _ in items],
+                  groups=[idx for idx, _, items in valid for _ in items])
+
+    now = datetime.utcnow()
+    state = stock.target_state('draft')
+    numbers = allocate_invoice_numbers(len(valid), now)
+    invoice_rows, line_rows, created = [], [], []
+    deltas, rollup = Counter(), Counter()
+    for n, ((idx, payload, items), number) in enumerate(zip(valid, numbers)):
+        row = {
+            'id': gen_uuid(),
+            'invoice_number': number,
+            'customer_id': payload['customer_id'],
+            'invoice_date': now,
+            'notes': payload.get('notes', ''),
+            'status': 'draft',
+            'stock_state': state,
+            'place_of_supply': places[payload['customer_id']],
+            # Keep batch order stable in created_at-ordered listings
+            'created_at': now + timedelta(microseconds=n),
+            **invoice_totals(items),
+        }
+        lines = item_rows(row['id'], items, products)
+        invoice_rows.append(row)
+        line_rows.extend(lines)
+        deltas.update(counters.row_invoice_contribution(row['grand_total'], now))
+        rollup.update(sales.lines_contribution(now, payload['customer_id'], lines, products))
+        created.append({'index': idx, 'id': row['id'], 'invoice_number': number,
+                        'grand_total': as_float(row['grand_total'])})
+
+    try:
+        db.session.bulk_insert_mappings(Invoice, invoice_rows)
+        db.session.bulk_insert_mappings(InvoiceItem, line_rows)
+        stock.transition(stock.quantities(line_rows), stock.NONE, state)
+        counters.bump(deltas)
+        sales.bump(rollup)
+        db.session.commit()
+    except stock.InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'products': e.products}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+    return jsonify({'created': created, 'errors': errors}), 201
+
+
 @api_bp.route('/invoices/<invoice_id>', methods=['GET'])
 @login_required
 def get_invoice(invoice_id):
-    invoice = Invoice.query.get_or_404(invoice_id)
+    invoice = invoice_query().get_or_404(invoice_id)
     return jsonify(invoice.to_dict())
 
 
 @api_bp.route('/invoices/<invoice_id>/pdf', methods=['GET'])
 @login_required
 def get_invoice_pdf(invoice_id):
-    invoice = Invoice.query.get_or_404(invoice_id)
-    pdf_buffer = generate_invoice_pdf(invoice)
-    return send_file(
-        pdf_buffer,
-        mimetype='application/pdf',
-        as_attachment=True,
-        download_name=f'{invoice.invoice_number}.pdf',
-    )
+    invoice = invoice_query().get_or_404(invoice_id)
+    if not pdf_cache.enabled():
+        if _wants_async():
+            return _accepted(jobs.enqueue('invoice_pdf', invoice_id=invoice.id))
+        return _send_pdf(generate_invoice_pdf(invoice), invoice)
+
+    digest = pdf_cache.content_hash(invoice)
+    if digest in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(digest)
+        return response
+
+    pdf = pdf_cache.get(invoice.id, digest)
+    if pdf is None and _wants_async():
+        return _accepted(jobs.enqueue('invoice_pdf', invoice_id=invoice.id))
+    if pdf is None:
+        pdf = pdf_cache.put(invoice.id, digest, generate_invoice_pdf(invoice))
+    return _send_pdf(pdf, invoice, etag=digest)
+
+
+@api_bp.route('/invoices/export.<fmt>', methods=['GET'])
+@login_required
+def export_invoice_pdfs(fmt):
+    """All invoices matching the list filters as a ZIP of PDFs or one merged PDF."""
+    if fmt not in pdf_export.MIMETYPES:
+        return jsonify({'error': 'Format must be zip or pdf'}), 404
+    try:
+        if _wants_async():
+            filter_invoices(Invoice.query, request.args)  # validate before queueing
+            return _accepted(jobs.enqueue('invoice_export', fmt=fmt,
+                                          filters=request.args.to_dict()))
+        snapshots = pdf_export.load_snapshots(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not snapshots:
+        return jsonify({'error': 'No invoices match'}), 404
+
+    workers = current_app.config.get('PDF_EXPORT_WORKERS') or pdf_export.default_workers()
+    body = pdf_export.stream(snapshots, fmt, workers)
+    return Response(body, mimetype=pdf_export.MIMETYPES[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{pdf_export.filename(request.args, fmt)}"',
+    })
 
 
 @api_bp.route('/invoices/<invoice_id>', methods=['PUT'])
@@ -364,10 +612,23 @@ def update_invoice(invoice_id):
     invoice = Invoice.query.get_or_404(invoice_id)
     data = request.get_json()
     if 'status' in data:
+        snap = catalog.get()
+        before = sales.invoice_contribution(invoice, snap)
+        if invoice.stock_state is not None:
+            target = stock.target_state(data['status'])
+            try:
+                stock.transition(stock.quantities(invoice.items), invoice.stock_state, target)
+            except stock.InsufficientStock as e:
+                db.session.rollback()
+                return jsonify({'error': str(e), 'products': e.products}), 409
+            invoice.stock_state = target
         invoice.status = data['status']
+        sales.bump(counters.diff(before, sales.invoice_contribution(invoice, snap)))
     if 'notes' in data:
         invoice.notes = data['notes']
     db.session.commit()
+    if 'status' in data or 'notes' in data:
+        pdf_cache.invalidate(invoice.id)
     return jsonify(invoice.to_dict())
 
 
@@ -375,84 +636,170 @@ def update_invoice(invoice_id):
 @login_required
 def delete_invoice(invoice_id):
     invoice = Invoice.query.get_or_404(invoice_id)
+    stock.transition(stock.quantities(invoice.items), invoice.stock_state, stock.NONE)
+    counters.bump(counters.negate(counters.invoice_contribution(invoice)))
+    sales.bump(counters.negate(sales.invoice_contribution(invoice)))
     db.session.delete(invoice)
     db.session.commit()
+    pdf_cache.invalidate(invoice_id)
     return jsonify({'message': 'Invoice deleted'})
 
 
+# ─────────────────────────── Reports ─────────────────────────────────────────
+
+@api_bp.route('/reports/gst', methods=['GET'])
+@login_required
+def get_gst_report():
+    """GSTR-1 style summary for ?from=&to=, streamed as it is read.
+
+    format=json (default: summary plus hsn, b2b and b2c sections) or
+    format=csv with section=hsn|b2b|b2c; status and customer_id filter
+    as in the invoice list.
+    """
+    try:
+        body, mimetype, name = gst_report.report(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    headers = {}
+    if mimetype == 'text/csv':
+        headers['Content-Disposition'] = f'attachment; filename="{name}"'
+    return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+
+
+@api_bp.route('/reports/sales/trend', methods=['GET'])
+@login_required
+@query_budget(1)
+def get_sales_trend():
+    """Sales per day or month from the sales_daily rollup (see app.utils.sales.trend)."""
+    try:
+        return fast_json.response(sales.trend(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@api_bp.route('/reports/sales/top', methods=['GET'])
+@login_required
+@query_budget(2)
+def get_sales_top():
+    """Top products or customers from the sales_daily rollup (see app.utils.sales.top)."""
+    try:
+        return fast_json.response(sales.top(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+# ─────────────────────────── Exports ─────────────────────────────────────────
+
+@api_bp.route('/export/<entity>.<fmt>', methods=['GET'])
+@login_required
+def export_table(entity, fmt):
+    """Stream invoices, items, inventory or customers as CSV or XLSX.
+
+    Takes the filters of the matching list endpoint (invoices and items:
+    status, customer_id, customer, from, to, q; inventory: brand, variant,
+    size, stock, q, sort).
+    """
+    try:
+        body, mimetype, name = exports.export(entity, fmt, request.args)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{name}"',
+    })
+
+
 # ─────────────────────────── Dashboard ───────────────────────────────────────
 
 @api_bp.route('/dashboard', methods=['GET'])
 @login_required
+@query_budget(3)
 def dashboard():
-    active_brands = Brand.query.filter_by(is_active=True).count()
-
-    # inventory value & total units — only count items with qty > 0
-    inv_items = db.session.query(Inventory, Product).join(Product).all()
-    total_value = sum(i.quantity * p.price for i, p in inv_items)
-    total_units = sum(i.quantity for i, p in inv_items)
-    stocked_products = sum(1 for i, p in inv_items if i.quantity > 0)
-    in_stock = sum(1 for i, p in inv_items if i.quantity > i.reorder_level)
-    low_stock = sum(1 for i, p in inv_items if i.quantity > 0 and i.quantity <= i.reorder_level)
-
-    today = datetime.utcnow().date()
-    today_invoices = Invoice.query.filter(
-        db.func.date(Invoice.invoice_date) == today
-    ).count()
-
-    total_invoices = Invoice.query.count()
-    total_revenue = db.session.query(db.func.coalesce(db.func.sum(Invoice.grand_total), 0)).scalar()
-
-    # brand-wise stock summary — only show qty-based numbers
-    brands = Brand.query.filter_by(is_active=True).all()
-    brand_summary = []
-    for b in brands:
-        prods = Product.query.filter_by(brand_id=b.id, is_active=True).all()
-        b_qty = 0
-        b_stocked = 0
-        b_low = 0
-        for p in prods:
-            if p.inventory and p.inventory.quantity > 0:
-                b_qty += p.inventory.quantity
-                b_stocked += 1
-                if p.inventory.quantity <= p.inventory.reorder_level:
-                    b_low += 1
-        brand_summary.append({'name': b.name, 'code': b.code, 'total_qty': b_qty, 'stocked': b_stocked, 'low_stock': b_low})
-
-    recent = Invoice.query.order_by(Invoice.created_at.desc()).limit(5).all()
+    stats = counters.read_dashboard()
+    recent = (invoice_query(include_items=False)
+              .order_by(Invoice.created_at.desc()).limit(5).all())
+    stats['recent_invoices'] = [r.to_dict(include_items=False) for r in recent]
+    return jsonify(stats)
 
-    return jsonify({
-        'stocked_products': stocked_products,
-        'active_brands': active_brands,
-        'total_inventory_value': round(total_value, 2),
-        'total_units': total_units,
-        'in_stock_count': in_stock,
-        'low_stock_count': low_stock,
-        'today_invoices': today_invoices,
-        'total_invoices': total_invoices,
-        'total_revenue': round(float(total_revenue), 2),
-        'brand_summary': brand_summary,
-        'recent_invoices': [r.to_dict() for r in recent],
-    })
+
+# ─────────────────────────── Jobs ────────────────────────────────────────────
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    data = job.to_dict()
+    if job.status == jobs.DONE:
+        data['result_url'] = url_for('api.get_job_result', job_id=job.id)
+    return jsonify(data)
+
+
+@api_bp.route('/jobs/<job_id>/result', methods=['GET'])
+@login_required
+def get_job_result(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.status != jobs.DONE:
+        return jsonify({'error': f'Job is {job.status}', 'status': job.status,
+                        'job_error': job.error}), 409
+    found = jobs.result_file(job)
+    if found is None:
+        return jsonify(job.to_dict()['result'])
+    path, name, mimetype = found
+    if not os.path.exists(path):
+        return jsonify({'error': 'Result has expired'}), 410
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=name)
 
 
 # ─────────────────────────── Helpers ─────────────────────────────────────────
 
+def _wants_async():
+    """True when the client asked for a background job (?async=1 or Prefer)."""
+    if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+
+def _accepted(job):
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+    return response
+
+
+def _send_pdf(pdf, invoice, etag=None):
+    response = send_file(
+        pdf,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=f'{invoice.invoice_number}.pdf',
+        etag=etag or False,
+        conditional=False,
+    )
+    if etag:
+        # Per-user data: let the browser keep it but always revalidate
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 def _auto_create_products(brand):
     """When a new brand is added, auto-create products for all variant+size combos."""
-    variants = Variant.query.all()
-    sizes = Size.query.all()
-    for v in variants:
-        for s in sizes:
+    snap = catalog.get()
+    existing = snap.index
+    for v in snap.variants.values():
+        for s in snap.sizes.values():
+            if (brand.code, v.name, s.size_inches) in existing:
+                continue
             name = f"{brand.name} {v.name} {int(s.size_inches)}\" Pipe"
             p = Product(
+                id=gen_uuid(),
                 name=name,
                 brand_id=brand.id,
                 variant_id=v.id,
                 size_id=s.id,
             )
             db.session.add(p)
-            db.session.flush()
             inv = Inventory(product_id=p.id, quantity=0, reorder_level=10)
             db.session.add(inv)
+    versions.bump('products', 'inventory')
     db.session.commit()
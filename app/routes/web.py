@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template
 from flask_login import login_required
 
+from app.utils import tax
+
 web_bp = Blueprint('web', __name__)
 
 
@@ -31,7 +33,8 @@ def new_invoice():
 @web_bp.route('/invoices/<invoice_id>')
 @login_required
 def view_invoice(invoice_id):
-    return render_template('view_invoice.html', invoice_id=invoice_id)
+    return render_template('view_invoice.html', invoice_id=invoice_id,
+                           home_state=tax.HOME_STATE, states=tax.STATES)
 
 
 @web_bp.route('/brands')
@@ -0,0 +1,211 @@
+"""In-process snapshot of the catalog: brands, variants, sizes, products.
+
+The catalog is small and read far more often than written, so each
+process keeps all of it in memory as immutable slotted records and the
+hot paths (invoice creation, CSV import, brand set-up, ``to_dict()``)
+read from there instead of querying.
+
+The snapshot is tagged with the ``table_versions`` of the catalog tables
+(see app.utils.versions). It is dropped as soon as a session that
+changed a catalog row commits in this process, and ``get()`` reloads it
+whenever another worker's writes have moved a version, checked at most
+every REFERENCE_CACHE_TTL seconds.
+"""
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Brand, Variant, Size, Product
+from app.utils import query_guard, versions
+
+
+CATALOG_TABLES = ('brands', 'variants', 'sizes', 'products')
+CATALOG_MODELS = (Brand, Variant, Size, Product)
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+# ─────────────────────────── Records ─────────────────────────────────────────
+
+@dataclass(frozen=True, slots=True)
+class BrandRecord:
+    id: str
+    name: str
+    code: str
+    description: str
+    is_active: bool
+    created_at: object
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'code': self.code,
+            'description': self.description,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class VariantRecord:
+    id: str
+    name: str
+    weight_kg: float
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'weight_kg': self.weight_kg}
+
+
+@dataclass(frozen=True, slots=True)
+class SizeRecord:
+    id: str
+    size_inches: float
+
+    def to_dict(self):
+        return {'id': self.id, 'size_inches': self.size_inches}
+
+
+@dataclass(frozen=True, slots=True)
+class ProductRecord:
+    id: str
+    name: str
+    brand_id: str
+    variant_id: str
+    size_id: str
+    hsn_code: str
+    unit: str
+    price: Decimal
+    is_active: bool
+
+
+def _records(cls, model):
+    columns = [getattr(model, f) for f in cls.__dataclass_fields__]
+    return {row[0]: cls(*row) for row in db.session.execute(db.select(*columns))}
+
+
+def normalize_key(brand, variant, size):
+    """Canonical (brand, variant, size) key, tolerant of CSV formatting.
+
+    Brand is matched case-insensitively on code or name, variant ignores
+    case and spaces ("4 KG" == "4kg") and size accepts 4, 4.0 or 4".
+    """
+    size = str(size).strip().rstrip('"').strip()
+    return (str(brand).strip().upper(),
+            str(variant).replace(' ', '').lower(),
+            float(size))
+
+
+class ProductIndex:
+    """(brand, variant, size) → product_id; each Catalog carries one."""
+
+    def __init__(self, rows=()):
+        self._by_key = {}
+        for product_id, code, name, variant, size in rows:
+            for brand in (code, name):
+                self._by_key[normalize_key(brand, variant, size)] = product_id
+
+    def lookup(self, brand, variant, size):
+        """product_id for the key, or None. Raises ValueError on a bad size."""
+        return self._by_key.get(normalize_key(brand, variant, size))
+
+    def __contains__(self, key):
+        return normalize_key(*key) in self._by_key
+
+    def __len__(self):
+        return len(set(self._by_key.values()))
+
+
+# ─────────────────────────── Snapshot ────────────────────────────────────────
+
+class Catalog:
+    """One consistent view of the catalog, never mutated once built."""
+
+    __slots__ = ('version', 'brands', 'variants', 'sizes', 'products', 'index')
+
+    def __init__(self, version, brands, variants, sizes, products):
+        self.version = version
+        self.brands = brands
+        self.variants = variants
+        self.sizes = sizes
+        self.products = products
+        self.index = ProductIndex(
+            (p.id, brands[p.brand_id].code, brands[p.brand_id].name,
+             variants[p.variant_id].name, sizes[p.size_id].size_inches)
+            for p in products.values()
+            if p.brand_id in brands and p.variant_id in variants and p.size_id in sizes)
+
+    @classmethod
+    def load(cls, version):
+        with query_guard.exempt():
+            return cls(version,
+                       _records(BrandRecord, Brand),
+                       _records(VariantRecord, Variant),
+                       _records(SizeRecord, Size),
+                       _records(ProductRecord, Product))
+
+
+def get(fresh=False):
+    """The current Catalog; ``fresh`` re-reads the versions first."""
+    global _snapshot
+    version = versions.current(CATALOG_TABLES, fresh=fresh)
+    snap = _snapshot
+    if snap is not None and snap.version == version:
+        return snap
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            # Versions were read before the rows, so the rows are at
+            # least that new and a later bump is never missed.
+            _snapshot = Catalog.load(version)
+        return _snapshot
+
+
+def products_by_id(product_ids, snapshot=None):
+    """{id: ProductRecord} for ``product_ids``.
+
+    Pass the request's ``snapshot`` when it already has one, so the
+    versions are not checked again. Ids missing from it (e.g. created by
+    another worker a moment ago) are looked up in the database.
+    """
+    snap = snapshot or get()
+    found, missing = {}, []
+    for pid in set(product_ids):
+        record = snap.products.get(pid)
+        if record is None:
+            missing.append(pid)
+        else:
+            found[pid] = record
+    if missing:
+        columns = [getattr(Product, f) for f in ProductRecord.__dataclass_fields__]
+        for row in db.session.execute(db.select(*columns).where(Product.id.in_(missing))):
+            found[row[0]] = ProductRecord(*row)
+    return found
+
+
+def invalidate():
+    global _snapshot
+    _snapshot = None
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_changes(session, flush_context):
+    if any(isinstance(obj, CATALOG_MODELS)
+           for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_on_commit(session):
+    if session.info.pop('catalog_changed', False):
+        invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(session):
+    session.info.pop('catalog_changed', None)
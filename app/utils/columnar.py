@@ -0,0 +1,170 @@
+"""Columnar JSON for the list endpoints (``?format=columnar``).
+
+The default list payloads nest a full brand/variant/size (or customer)
+dict inside every row. The columnar form sends each referenced brand,
+variant, size or customer once, in a lookup table keyed by id, and the
+rows as one array per field::
+
+    {"columns": {"id": [...], "name": [...], "brand_id": [...], ...},
+     "brands": {"<id>": {"name": ..., "code": ...}}, ...}
+
+Rows are read as plain tuples from a Core ``select()``; no ORM objects
+are built.
+"""
+from app import db
+from app.models import (
+    Brand, Variant, Size, Product, Inventory, Customer, Invoice, InvoiceItem,
+)
+from app.utils.queries import filter_invoices, invoices_after, newest_first
+from app.utils.inventory_search import filter_inventory
+from app.utils.pagination import encode_cursor
+
+
+MEDIA_TYPE = 'application/vnd.kvm.columnar+json'
+
+PRODUCT_COLUMNS = {
+    'id': Product.id,
+    'name': Product.name,
+    'brand_id': Product.brand_id,
+    'variant_id': Product.variant_id,
+    'size_id': Product.size_id,
+    'hsn_code': Product.hsn_code,
+    'unit': Product.unit,
+    'price': Product.price,
+    'is_active': Product.is_active,
+    'quantity': Inventory.quantity,
+    'reorder_level': Inventory.reorder_level,
+    'reserved': Inventory.reserved,
+}
+
+# lookup name -> (id column, {field: column})
+PRODUCT_LOOKUPS = {
+    'brands': (Brand.id, {'name': Brand.name, 'code': Brand.code,
+                          'description': Brand.description, 'is_active': Brand.is_active}),
+    'variants': (Variant.id, {'name': Variant.name, 'weight_kg': Variant.weight_kg}),
+    'sizes': (Size.id, {'size_inches': Size.size_inches}),
+}
+
+INVOICE_COLUMNS = {
+    'id': Invoice.id,
+    'invoice_number': Invoice.invoice_number,
+    'customer_id': Invoice.customer_id,
+    'invoice_date': Invoice.invoice_date,
+    'subtotal': Invoice.subtotal,
+    'cgst_total': Invoice.cgst_total,
+    'sgst_total': Invoice.sgst_total,
+    'igst_total': Invoice.igst_total,
+    'grand_total': Invoice.grand_total,
+    'status': Invoice.status,
+    'place_of_supply': Invoice.place_of_supply,
+    'notes': Invoice.notes,
+    'created_at': Invoice.created_at,
+}
+
+INVOICE_LOOKUPS = {
+    'customers': (Customer.id, {'name': Customer.name, 'gstin': Customer.gstin,
+                                'phone': Customer.phone, 'city': Customer.city,
+                                'state': Customer.state}),
+}
+
+ITEM_COLUMNS = {
+    'id': InvoiceItem.id,
+    'invoice_id': InvoiceItem.invoice_id,
+    'product_id': InvoiceItem.product_id,
+    'product_name': InvoiceItem.product_name,
+    'hsn_code': InvoiceItem.hsn_code,
+    'quantity': InvoiceItem.quantity,
+    'unit_price': InvoiceItem.unit_price,
+    'discount_percent': InvoiceItem.discount_percent,
+    'gst_rate': InvoiceItem.gst_rate,
+    'taxable_amount': InvoiceItem.taxable_amount,
+    'cgst_amount': InvoiceItem.cgst_amount,
+    'sgst_amount': InvoiceItem.sgst_amount,
+    'igst_amount': InvoiceItem.igst_amount,
+    'total': InvoiceItem.total,
+}
+
+
+def wants_columnar(request):
+    if request.args.get('format') == 'columnar':
+        return True
+    return request.accept_mimetypes.best == MEDIA_TYPE
+
+
+def _select(columns, lookups):
+    cols = list(columns.values())
+    for id_col, fields in lookups.values():
+        cols.append(id_col)
+        cols.extend(fields.values())
+    return db.select(*cols)
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _table(rows, columns, lookups, dates=()):
+    """Split flat result rows into column arrays and lookup tables."""
+    names = list(columns)
+    data = {name: [] for name in names}
+    tables = {name: {} for name in lookups}
+    width = len(names)
+    for row in rows:
+        for i, name in enumerate(names):
+            data[name].append(row[i])
+        pos = width
+        for name, (_, fields) in lookups.items():
+            key = row[pos]
+            if key is not None and key not in tables[name]:
+                tables[name][key] = dict(zip(fields, row[pos + 1:pos + 1 + len(fields)]))
+            pos += 1 + len(fields)
+    for name in dates:
+        data[name] = [_iso(v) for v in data[name]]
+    return {'columns': data, **tables}
+
+
+def _product_select():
+    return (_select(PRODUCT_COLUMNS, PRODUCT_LOOKUPS)
+            .select_from(Product)
+            .join(Product.brand).join(Product.variant).join(Product.size))
+
+
+def products():
+    rows = db.session.execute(
+        _product_select()
+        .outerjoin(Product.inventory)
+        .where(Product.is_active.is_(True))
+    ).all()
+    return _table(rows, PRODUCT_COLUMNS, PRODUCT_LOOKUPS)
+
+
+def inventory(args, limit, offset):
+    """One page of /api/inventory; same filters, inventory row required."""
+    query = filter_inventory(_product_select().join(Product.inventory), args)
+    rows = db.session.execute(query.limit(limit).offset(offset)).all()
+    return _table(rows, PRODUCT_COLUMNS, PRODUCT_LOOKUPS)
+
+
+def invoices(args, limit, include_items=True):
+    """One keyset page of /api/invoices; returns (payload, next_cursor)."""
+    query = filter_invoices(
+        _select(INVOICE_COLUMNS, INVOICE_LOOKUPS)
+        .select_from(Invoice).outerjoin(Invoice.customer), args)
+    if args.get('cursor'):
+        query = invoices_after(query, args['cursor'])
+    rows = db.session.execute(query.order_by(*newest_first()).limit(limit + 1)).all()
+    page, has_more = rows[:limit], len(rows) > limit
+
+    payload = _table(page, INVOICE_COLUMNS, INVOICE_LOOKUPS,
+                     dates=('invoice_date', 'created_at'))
+    if include_items:
+        ids = payload['columns']['id']
+        items = db.session.execute(
+            db.select(*ITEM_COLUMNS.values()).where(InvoiceItem.invoice_id.in_(ids))
+        ).all() if ids else []
+        payload['items'] = _table(items, ITEM_COLUMNS, {})['columns']
+    next_cursor = None
+    if has_more:
+        created_at = page[-1][list(INVOICE_COLUMNS).index('created_at')]
+        next_cursor = encode_cursor(created_at, page[-1][0])
+    return payload, next_cursor
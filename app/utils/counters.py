@@ -0,0 +1,220 @@
+"""Materialized dashboard counters.
+
+The dashboard totals live in the ``stat_counters`` table and are kept
+current by the write handlers: each one works out how much the rows it
+touched contributed before and after the change and applies the
+difference with ``UPDATE ... SET value = value + :delta`` inside its own
+transaction. Reading the dashboard is then a lookup of a handful of rows.
+
+Every invoice write changes the same few totals, and an UPDATE holds its
+row lock until commit, so each counter is split over COUNTER_SLOTS rows:
+a write adds to a random slot and readers sum the slots. Concurrent
+invoice transactions then seldom queue behind one another.
+
+``reconcile()`` recomputes every counter from scratch, reports drift and
+overwrites the stored values; run it periodically with
+``flask reconcile-stats``. Money counters are exact Numeric sums, so any
+difference at all is drift.
+"""
+import random
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import StatCounter, Brand
+from app.utils.stats import stock_by_brand, invoice_stats, today_range
+
+
+TOTAL_KEYS = (
+    'total_inventory_value', 'total_units', 'stocked_products',
+    'in_stock_count', 'low_stock_count', 'total_invoices', 'total_revenue',
+)
+BRAND_FIELDS = ('qty', 'stocked', 'low')
+
+
+def _brand_key(brand_id, field):
+    return f'brand:{brand_id}:{field}'
+
+
+def _day_key(day):
+    return f'invoices_on:{day.isoformat()}'
+
+
+# ─────────────────────────── Contributions ───────────────────────────────────
+
+def stock_contribution(product, inventory):
+    """Counter values contributed by one product's inventory row."""
+    if product is None or inventory is None:
+        return Counter()
+    return row_contribution(product.brand_id, product.price, product.is_active,
+                            inventory.quantity, inventory.reorder_level)
+
+
+def row_contribution(brand_id, price, is_active, quantity, reorder_level):
+    """Same as stock_contribution() but from plain column values."""
+    qty = quantity or 0
+    reorder = reorder_level or 0
+    stocked = qty > 0
+    low = stocked and qty <= reorder
+    c = Counter({
+        'total_inventory_value': qty * (price or 0),
+        'total_units': qty,
+        'stocked_products': int(stocked),
+        'in_stock_count': int(qty > reorder),
+        'low_stock_count': int(low),
+    })
+    if is_active and stocked:
+        c[_brand_key(brand_id, 'qty')] = qty
+        c[_brand_key(brand_id, 'stocked')] = 1
+        c[_brand_key(brand_id, 'low')] = int(low)
+    return c
+
+
+def invoice_contribution(invoice):
+    return row_invoice_contribution(invoice.grand_total, invoice.invoice_date)
+
+
+def row_invoice_contribution(grand_total, invoice_date):
+    c = Counter({'total_invoices': 1, 'total_revenue': grand_total or 0})
+    if invoice_date:
+        c[_day_key(invoice_date.date())] = 1
+    return c
+
+
+def diff(before, after):
+    """Per-key delta between two contributions."""
+    delta = Counter(after)
+    delta.subtract(before)
+    return delta
+
+
+def negate(contribution):
+    return Counter({k: -v for k, v in contribution.items()})
+
+
+# ─────────────────────────── Storage ─────────────────────────────────────────
+
+def pick_slot():
+    """A random slot in [0, COUNTER_SLOTS) for one transaction's writes."""
+    return random.randrange(max(1, current_app.config.get('COUNTER_SLOTS', 1)))
+
+
+def bump(deltas):
+    """Add ``deltas`` to the stored counters in the current transaction."""
+    slot = pick_slot()
+    for key, delta in deltas.items():
+        if delta:
+            _write(key, delta, additive=True, slot=slot)
+
+
+def _write(key, value, additive, slot=0):
+    new_value = StatCounter.value + value if additive else value
+    stmt = (db.update(StatCounter).where(StatCounter.key == key, StatCounter.slot == slot)
+            .values(value=new_value))
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(StatCounter(key=key, slot=slot, value=value))
+    except IntegrityError:
+        # Another worker created the row between our UPDATE and INSERT.
+        db.session.execute(stmt)
+
+
+def _stored():
+    return dict(db.session.execute(
+        db.select(StatCounter.key, db.func.sum(StatCounter.value)).group_by(StatCounter.key)
+    ).all())
+
+
+def read_dashboard():
+    """Dashboard totals and brand summary from the stored counters."""
+    start, _ = today_range()
+    day_key = _day_key(start.date())
+    rows = (db.session.query(StatCounter.key, db.func.sum(StatCounter.value))
+            .filter(db.or_(StatCounter.key.in_(TOTAL_KEYS + (day_key,)),
+                           StatCounter.key.startswith('brand:')))
+            .group_by(StatCounter.key)
+            .all())
+    values = dict(rows)
+    brands = (db.session.query(Brand.id, Brand.name, Brand.code)
+              .filter(Brand.is_active.is_(True))
+              .order_by(Brand.created_at, Brand.name)
+              .all())
+
+    def val(key):
+        return values.get(key, 0)
+
+    return {
+        'stocked_products': int(val('stocked_products')),
+        'active_brands': len(brands),
+        'total_inventory_value': float(val('total_inventory_value')),
+        'total_units': int(val('total_units')),
+        'in_stock_count': int(val('in_stock_count')),
+        'low_stock_count': int(val('low_stock_count')),
+        'today_invoices': int(val(day_key)),
+        'total_invoices': int(val('total_invoices')),
+        'total_revenue': float(val('total_revenue')),
+        'brand_summary': [
+            {'name': b.name, 'code': b.code,
+             'total_qty': int(val(_brand_key(b.id, 'qty'))),
+             'stocked': int(val(_brand_key(b.id, 'stocked'))),
+             'low_stock': int(val(_brand_key(b.id, 'low')))}
+            for b in brands
+        ],
+    }
+
+
+# ─────────────────────────── Reconcile ───────────────────────────────────────
+
+def expected_counters():
+    """Every counter recomputed from the source tables."""
+    expected = dict.fromkeys(TOTAL_KEYS, 0)
+    for r in stock_by_brand():
+        expected['total_inventory_value'] += r.value
+        expected['total_units'] += r.units
+        expected['stocked_products'] += r.stocked
+        expected['in_stock_count'] += r.in_stock
+        expected['low_stock_count'] += r.low
+        for field, value in zip(BRAND_FIELDS, (r.b_qty, r.b_stocked, r.b_low)):
+            if value:
+                expected[_brand_key(r.brand_id, field)] = value
+
+    inv = invoice_stats()
+    expected['total_invoices'] = inv['total_invoices']
+    expected['total_revenue'] = inv['total_revenue']
+    start, _ = today_range()
+    expected[_day_key(start.date())] = inv['today_invoices']
+    return expected
+
+
+def reconcile(fix=True):
+    """Compare stored counters with a fresh computation.
+
+    Returns ``{key: (stored, expected)}`` for every counter that drifted.
+    With ``fix`` the stored values are overwritten (in slot 0, the other
+    slots emptied) and stale keys (old days, removed brands) deleted, all
+    in one commit.
+    """
+    stored = _stored()
+    expected = expected_counters()
+    today_key = _day_key(today_range()[0].date())
+
+    drift = {}
+    for key in set(stored) | set(expected):
+        if key.startswith('invoices_on:') and key != today_key:
+            continue
+        have, want = stored.get(key, 0), expected.get(key, 0)
+        if have != want:
+            drift[key] = (have, want)
+
+    if fix:
+        for key in set(stored) - set(expected):
+            db.session.execute(db.delete(StatCounter).where(StatCounter.key == key))
+        db.session.execute(db.delete(StatCounter).where(StatCounter.slot != 0))
+        for key, value in expected.items():
+            _write(key, value, additive=False)
+        db.session.commit()
+    return drift
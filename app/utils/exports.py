@@ -0,0 +1,159 @@
+"""Streaming CSV / XLSX exports (/api/export/<entity>.<fmt>).
+
+Each entity is a Core ``select()`` of labeled columns built with the
+same filter helpers as its list endpoint, so an export matches what the
+list shows. Rows are fetched ``YIELD_PER`` at a time (a server-side
+cursor on PostgreSQL) and written out as they arrive: memory stays flat
+however many rows match.
+
+CSV is sent in chunks as it is produced. XLSX needs openpyxl (optional);
+its write-only workbook keeps rows in a temporary file, and the finished
+file is streamed once saved, since the ZIP container is written last.
+"""
+import csv
+import io
+import tempfile
+
+from app import db
+from app.models import (
+    Brand, Variant, Size, Product, Inventory, Customer, Invoice, InvoiceItem,
+)
+from app.utils.inventory_search import filter_inventory
+from app.utils.queries import filter_invoices
+
+try:
+    import openpyxl
+except ImportError:  # optional: .xlsx exports
+    openpyxl = None
+
+
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _invoice_columns():
+    return (
+        Invoice.invoice_number, Invoice.invoice_date, Invoice.status,
+        Customer.name.label('customer'), Customer.gstin.label('customer_gstin'),
+        Invoice.place_of_supply, Invoice.subtotal, Invoice.cgst_total,
+        Invoice.sgst_total, Invoice.igst_total, Invoice.grand_total, Invoice.notes,
+    )
+
+
+def invoices(args):
+    """Invoice headers; same filters as GET /api/invoices."""
+    stmt = (db.select(*_invoice_columns())
+            .select_from(Invoice)
+            .outerjoin(Customer, Customer.id == Invoice.customer_id))
+    return filter_invoices(stmt, args).order_by(Invoice.invoice_date, Invoice.invoice_number)
+
+
+def items(args):
+    """Invoice lines with their invoice; same filters as GET /api/invoices."""
+    stmt = (db.select(
+                Invoice.invoice_number, Invoice.invoice_date, Invoice.status,
+                Customer.name.label('customer'), Customer.gstin.label('customer_gstin'),
+                Invoice.place_of_supply, InvoiceItem.product_id, InvoiceItem.product_name,
+                InvoiceItem.hsn_code, InvoiceItem.quantity, InvoiceItem.unit_price,
+                InvoiceItem.discount_percent, InvoiceItem.gst_rate, InvoiceItem.taxable_amount,
+                InvoiceItem.cgst_amount, InvoiceItem.sgst_amount, InvoiceItem.igst_amount,
+                InvoiceItem.total,
+            )
+            .select_from(InvoiceItem)
+            .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+            .outerjoin(Customer, Customer.id == Invoice.customer_id))
+    return filter_invoices(stmt, args).order_by(Invoice.invoice_date, Invoice.invoice_number)
+
+
+def inventory(args):
+    """Stock per product; same filters and sort as GET /api/inventory."""
+    stmt = (db.select(
+                Product.id.label('product_id'), Product.name.label('product'),
+                Brand.name.label('brand'), Variant.name.label('variant'), Size.size_inches,
+                Product.hsn_code, Product.unit, Product.price, Product.is_active,
+                Inventory.quantity, Inventory.reserved, Inventory.reorder_level,
+            )
+            .select_from(Product)
+            .join(Product.inventory).join(Product.brand)
+            .join(Product.variant).join(Product.size))
+    return filter_inventory(stmt, args)
+
+
+def customers(args):
+    """Every customer, by name (GET /api/customers has no filters)."""
+    return (db.select(Customer.id, Customer.name, Customer.gstin, Customer.phone,
+                      Customer.email, Customer.address, Customer.city, Customer.state,
+                      Customer.pincode, Customer.created_at)
+            .order_by(Customer.name, Customer.id))
+
+
+ENTITIES = {
+    'invoices': invoices,
+    'items': items,
+    'inventory': inventory,
+    'customers': customers,
+}
+
+
+def _rows(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+
+
+def header(stmt):
+    return [c.name for c in stmt.selected_columns]
+
+
+def csv_chunks(stmt):
+    """CSV text of ``stmt``'s rows, header first, in chunks of YIELD_PER rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header(stmt))
+    for n, row in enumerate(_rows(stmt), 1):
+        writer.writerow(row)
+        if n % YIELD_PER == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def xlsx_chunks(stmt, title):
+    """An XLSX workbook of ``stmt``'s rows in one sheet, in CHUNK_SIZE pieces."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(header(stmt))
+    for row in _rows(stmt):
+        sheet.append(tuple(row))
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while chunk := spool.read(CHUNK_SIZE):
+            yield chunk
+
+
+def export(entity, fmt, args):
+    """(body chunks, mimetype, filename) for an export.
+
+    The filters are checked here; the query runs as the body is read.
+    Raises LookupError for an unknown entity or format and ValueError
+    for bad filters.
+    """
+    if entity not in ENTITIES:
+        raise LookupError(f'Unknown export {entity!r}; one of: {", ".join(ENTITIES)}')
+    if fmt not in MIMETYPES:
+        raise LookupError(f'Format must be one of: {", ".join(MIMETYPES)}')
+    if fmt == 'xlsx' and openpyxl is None:
+        raise LookupError('XLSX export needs openpyxl; use .csv')
+    stmt = ENTITIES[entity](args)
+    body = csv_chunks(stmt) if fmt == 'csv' else xlsx_chunks(stmt, entity)
+    return body, MIMETYPES[fmt], filename(entity, args, fmt)
+
+
+def filename(entity, args, fmt):
+    period = '_'.join(filter(None, (args.get('from'), args.get('to'))))
+    return f"{entity}{'_' + period if period else ''}.{fmt}"
@@ -0,0 +1,179 @@
+"""Fast path for the read-only list endpoints.
+
+``Product.to_dict()`` / ``Invoice.to_dict()`` need fully built ORM
+instances (identity map, relationship loading, attribute instrumentation)
+and format every datetime by hand. For the product and invoice listings
+the same JSON is produced here from plain tuples of a Core ``select()``
+with labeled columns, and encoded with orjson when it is installed
+(it handles datetimes natively) or the stdlib json module otherwise.
+
+The output matches the ``to_dict()`` shapes key for key; keep the two in
+step when a serializer changes. ``bench_serialize.py`` compares both
+paths.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app
+
+from app import db
+from app.models import Product, Inventory, Customer, Invoice, InvoiceItem
+from app.utils.queries import filter_invoices, invoices_after, newest_first
+from app.utils.pagination import encode_cursor
+from app.utils import catalog
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Encode ``obj`` to JSON bytes (datetimes as ISO 8601)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def response(obj, status=200):
+    return current_app.response_class(dumps(obj), status=status, mimetype='application/json')
+
+
+# ─────────────────────────── Products ────────────────────────────────────────
+
+_PRODUCT_COLUMNS = (
+    Product.id, Product.name, Product.brand_id, Product.variant_id, Product.size_id,
+    Product.hsn_code, Product.unit, Product.price, Product.is_active,
+    Inventory.id.label('i_id'), Inventory.quantity.label('i_quantity'),
+    Inventory.reorder_level.label('i_reorder_level'), Inventory.reserved.label('i_reserved'),
+)
+
+
+def _lookup(records, cache, key):
+    if key not in cache:
+        record = records.get(key)
+        cache[key] = record.to_dict() if record else None
+    return cache[key]
+
+
+def products():
+    """Active products, shaped like ``[Product.to_dict(), ...]``.
+
+    Brand, variant and size dicts come from the catalog snapshot.
+    """
+    rows = db.session.execute(
+        db.select(*_PRODUCT_COLUMNS)
+        .select_from(Product)
+        .outerjoin(Product.inventory)
+        .where(Product.is_active.is_(True))
+    ).all()
+
+    snap = catalog.get()
+    if any(r.brand_id not in snap.brands or r.variant_id not in snap.variants
+           or r.size_id not in snap.sizes for r in rows):
+        snap = catalog.get(fresh=True)  # rows newer than the snapshot
+    brands, variants, sizes = {}, {}, {}
+    result = []
+    for r in rows:
+        result.append({
+            'id': r.id,
+            'name': r.name,
+            'brand_id': r.brand_id,
+            'variant_id': r.variant_id,
+            'size_id': r.size_id,
+            'brand': _lookup(snap.brands, brands, r.brand_id),
+            'variant': _lookup(snap.variants, variants, r.variant_id),
+            'size': _lookup(snap.sizes, sizes, r.size_id),
+            'hsn_code': r.hsn_code,
+            'unit': r.unit,
+            'price': r.price,
+            'is_active': r.is_active,
+            'inventory': {
+                'id': r.i_id, 'product_id': r.id, 'quantity': r.i_quantity,
+                'reorder_level': r.i_reorder_level, 'reserved': r.i_reserved or 0,
+            } if r.i_id is not None else None,
+        })
+    return result
+
+
+# ─────────────────────────── Invoices ────────────────────────────────────────
+
+_INVOICE_COLUMNS = (
+    Invoice.id, Invoice.invoice_number, Invoice.customer_id, Invoice.invoice_date,
+    Invoice.subtotal, Invoice.cgst_total, Invoice.sgst_total, Invoice.igst_total,
+    Invoice.grand_total, Invoice.status, Invoice.place_of_supply, Invoice.notes,
+    Invoice.created_at,
+    Customer.id.label('c_id'), Customer.name.label('c_name'), Customer.gstin.label('c_gstin'),
+    Customer.phone.label('c_phone'), Customer.email.label('c_email'),
+    Customer.address.label('c_address'), Customer.city.label('c_city'),
+    Customer.state.label('c_state'), Customer.pincode.label('c_pincode'),
+    Customer.created_at.label('c_created_at'),
+)
+
+_ITEM_COLUMNS = (
+    InvoiceItem.id, InvoiceItem.invoice_id, InvoiceItem.product_id,
+    InvoiceItem.product_name, InvoiceItem.hsn_code, InvoiceItem.quantity,
+    InvoiceItem.unit_price, InvoiceItem.discount_percent, InvoiceItem.gst_rate,
+    InvoiceItem.taxable_amount, InvoiceItem.cgst_amount, InvoiceItem.sgst_amount,
+    InvoiceItem.igst_amount, InvoiceItem.total,
+)
+
+
+def invoices(args, limit, include_items=True):
+    """One keyset page shaped like ``Invoice.to_dict()``; returns (rows, next_cursor)."""
+    query = filter_invoices(
+        db.select(*_INVOICE_COLUMNS).select_from(Invoice).outerjoin(Invoice.customer), args)
+    if args.get('cursor'):
+        query = invoices_after(query, args['cursor'])
+    rows = db.session.execute(query.order_by(*newest_first()).limit(limit + 1)).all()
+    page, has_more = rows[:limit], len(rows) > limit
+
+    items_by_invoice = {}
+    if include_items and page:
+        names = [c.key for c in _ITEM_COLUMNS]
+        for item in db.session.execute(
+                db.select(*_ITEM_COLUMNS)
+                .where(InvoiceItem.invoice_id.in_([r.id for r in page]))):
+            items_by_invoice.setdefault(item.invoice_id, []).append(dict(zip(names, item)))
+
+    customers = {}
+    result = []
+    for r in page:
+        customer = customers.get(r.c_id)
+        if customer is None and r.c_id is not None:
+            customer = customers[r.c_id] = {
+                'id': r.c_id, 'name': r.c_name, 'gstin': r.c_gstin, 'phone': r.c_phone,
+                'email': r.c_email, 'address': r.c_address, 'city': r.c_city,
+                'state': r.c_state, 'pincode': r.c_pincode, 'created_at': r.c_created_at,
+            }
+        data = {
+            'id': r.id,
+            'invoice_number': r.invoice_number,
+            'customer_id': r.customer_id,
+            'customer': customer,
+            'invoice_date': r.invoice_date,
+            'subtotal': r.subtotal,
+            'cgst_total': r.cgst_total,
+            'sgst_total': r.sgst_total,
+            'igst_total': r.igst_total,
+            'grand_total': r.grand_total,
+            'status': r.status,
+            'place_of_supply': r.place_of_supply,
+            'notes': r.notes,
+            'created_at': r.created_at,
+        }
+        if include_items:
+            data['items'] = items_by_invoice.get(r.id, [])
+        result.append(data)
+
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if has_more else None
+    return result, next_cursor
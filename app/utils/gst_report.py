@@ -0,0 +1,158 @@
+"""GSTR-1 style GST summary for a date range (/api/reports/gst).
+
+Every section is one GROUP BY over ``invoice_items`` joined to their
+invoice and customer, restricted by ``invoices.invoice_date`` so a
+period only touches its own invoices (ix_invoices_invoice_date, then
+ix_invoice_items_invoice_id):
+
+``hsn``
+    per HSN code and rate: quantity and amounts;
+``b2b``
+    per customer GSTIN, place of supply and rate;
+``b2c``
+    customers without a GSTIN, per place of supply and rate.
+
+``summary`` adds up the invoice headers for the same invoices. Cancelled
+invoices are left out unless ``status`` is given. Rows are fetched in
+batches and written to the client as they arrive, as JSON or as one CSV
+per section.
+"""
+from app import db
+from app.models import Customer, Invoice, InvoiceItem, HsnRate
+from app.utils import tax
+from app.utils.exports import csv_chunks
+from app.utils.fast_json import dumps
+from app.utils.pagination import parse_date_range
+from app.utils.queries import filter_invoices
+from app.utils.stats import count_if
+
+
+SECTIONS = ('hsn', 'b2b', 'b2c')
+FORMATS = ('json', 'csv')
+YIELD_PER = 500
+
+# Constant SQL literals rather than bound parameters, so the same
+# expression in the SELECT list and the GROUP BY compares equal on
+# servers that bind parameters themselves.
+_GSTIN = db.func.nullif(db.func.upper(db.func.trim(Customer.gstin)), db.literal_column("''"))
+_PLACE = db.func.coalesce(Invoice.place_of_supply, db.literal_column(f"'{tax.HOME_STATE}'"))
+
+
+def _amounts():
+    return (
+        db.func.count(db.distinct(InvoiceItem.invoice_id)).label('invoices'),
+        db.func.sum(InvoiceItem.taxable_amount).label('taxable_value'),
+        db.func.sum(InvoiceItem.cgst_amount).label('cgst'),
+        db.func.sum(InvoiceItem.sgst_amount).label('sgst'),
+        db.func.sum(InvoiceItem.igst_amount).label('igst'),
+        db.func.sum(InvoiceItem.total).label('total'),
+    )
+
+
+def _filtered(stmt, args):
+    stmt = filter_invoices(stmt, args)
+    if not args.get('status'):
+        stmt = stmt.where(Invoice.status != 'cancelled')
+    return stmt
+
+
+def _lines(args, *columns):
+    stmt = (db.select(*columns)
+            .select_from(InvoiceItem)
+            .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+            .outerjoin(Customer, Customer.id == Invoice.customer_id))
+    return _filtered(stmt, args)
+
+
+def hsn_summary(args):
+    rate = InvoiceItem.gst_rate
+    return (_lines(args, InvoiceItem.hsn_code, HsnRate.description, rate.label('rate'),
+                   db.func.sum(InvoiceItem.quantity).label('quantity'), *_amounts())
+            .outerjoin(HsnRate, HsnRate.hsn_code == InvoiceItem.hsn_code)
+            .group_by(InvoiceItem.hsn_code, HsnRate.description, rate)
+            .order_by(InvoiceItem.hsn_code, rate))
+
+
+def b2b_summary(args):
+    rate = InvoiceItem.gst_rate
+    return (_lines(args, _GSTIN.label('gstin'), db.func.min(Customer.name).label('customer'),
+                   _PLACE.label('place_of_supply'), rate.label('rate'), *_amounts())
+            .where(_GSTIN.is_not(None))
+            .group_by(_GSTIN, _PLACE, rate)
+            .order_by(_GSTIN, _PLACE, rate))
+
+
+def b2c_summary(args):
+    rate = InvoiceItem.gst_rate
+    return (_lines(args, _PLACE.label('place_of_supply'), rate.label('rate'), *_amounts())
+            .where(_GSTIN.is_(None))
+            .group_by(_PLACE, rate)
+            .order_by(_PLACE, rate))
+
+
+QUERIES = {'hsn': hsn_summary, 'b2b': b2b_summary, 'b2c': b2c_summary}
+
+
+def summary(args):
+    """Header totals of the invoices in the report, split into B2B and B2C."""
+    b2b = _GSTIN.is_not(None)
+    stmt = _filtered(
+        db.select(
+            db.func.count(Invoice.id).label('invoices'),
+            count_if(b2b).label('b2b_invoices'),
+            count_if(db.not_(b2b)).label('b2c_invoices'),
+            db.func.coalesce(db.func.sum(Invoice.subtotal), 0).label('taxable_value'),
+            db.func.coalesce(db.func.sum(Invoice.cgst_total), 0).label('cgst'),
+            db.func.coalesce(db.func.sum(Invoice.sgst_total), 0).label('sgst'),
+            db.func.coalesce(db.func.sum(Invoice.igst_total), 0).label('igst'),
+            db.func.coalesce(db.func.sum(Invoice.grand_total), 0).label('total'),
+        ).select_from(Invoice).outerjoin(Customer, Customer.id == Invoice.customer_id),
+        args)
+    return dict(db.session.execute(stmt).one()._mapping)
+
+
+def period(args):
+    """(from, to) strings; both are required. Raises ValueError."""
+    start, end = parse_date_range(args)
+    if start is None or end is None:
+        raise ValueError('from and to are required (YYYY-MM-DD)')
+    if start >= end:
+        raise ValueError('from must not be after to')
+    return args['from'], args['to']
+
+
+def _rows(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+    for row in result:
+        yield row._mapping
+
+
+def _json_chunks(args, start, end):
+    yield b'{"from":' + dumps(start) + b',"to":' + dumps(end)
+    yield b',"summary":' + dumps(summary(args))
+    for section in SECTIONS:
+        yield b',"' + section.encode('ascii') + b'":['
+        sep = b''
+        for row in _rows(QUERIES[section](args)):
+            yield sep + dumps(dict(row))
+            sep = b','
+        yield b']'
+    yield b'}'
+
+
+def report(args):
+    """(body chunks, mimetype, filename) for the request's ``args``.
+
+    The filters are checked here; the queries run as the body is read.
+    Raises ValueError for bad parameters.
+    """
+    start, end = period(args)
+    fmt = args.get('format', 'json')
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of: {", ".join(FORMATS)}')
+    if fmt == 'json':
+        return _json_chunks(args, start, end), 'application/json', f'gst_{start}_{end}.json'
+    section = args.get('section', 'hsn')
+    if section not in QUERIES:
+        raise ValueError(f'section must be one of: {", ".join(SECTIONS)}')
+    return csv_chunks(QUERIES[section](args)), 'text/csv', f'gst_{section}_{start}_{end}.csv'
@@ -0,0 +1,146 @@
+"""Streaming, set-based CSV stock import.
+
+The upload is decoded on the fly and processed in chunks of CHUNK_SIZE
+rows: each chunk resolves its product ids with one IN query and writes
+its quantities with one bulk UPDATE. Bad rows are reported back with
+their line number instead of aborting the import.
+
+Rows identify the product either by ``product_id`` or by the natural key
+``brand_code, variant, size_inches``; natural keys are resolved through
+the in-process catalog snapshot, brought up to date when the import
+starts.
+"""
+import csv
+import io
+from collections import Counter
+
+from app import db
+from app.models import Product, Inventory
+from app.utils import counters
+from app.utils import versions
+from app.utils import catalog
+
+
+CHUNK_SIZE = 1000
+NATURAL_KEY = ('brand_code', 'variant', 'size_inches')
+MAX_REPORTED_ERRORS = 500
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []
+        self.deltas = Counter()
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def to_dict(self):
+        return {
+            'message': f'{self.updated} items updated',
+            'rows': self.rows,
+            'updated': self.updated,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda e: e['line']),
+        }
+
+
+def open_csv(binary_stream):
+    """DictReader over an uploaded file without reading it into memory."""
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    return csv.DictReader(text)
+
+
+def _parse_quantity(raw):
+    qty = int((raw or '').strip())
+    if qty < 0:
+        raise ValueError
+    return qty
+
+
+def import_inventory(reader):
+    """Apply stock quantities from ``reader`` rows; returns an ImportResult.
+
+    The caller commits. Counter deltas for the dashboard are applied to
+    the session before returning.
+    """
+    fields = set(reader.fieldnames or ())
+    by_id = 'product_id' in fields
+    by_key = fields.issuperset(NATURAL_KEY)
+    if 'quantity' not in fields or not (by_id or by_key):
+        raise ValueError('CSV must have a quantity column and either product_id '
+                         'or brand_code, variant and size_inches columns')
+
+    result = ImportResult()
+    index = None
+    chunk = {}
+    for row in reader:
+        line = reader.line_num
+        first = next(iter(row.values()), None) or ''
+        if first.strip().startswith('#'):
+            continue
+        pid = (row.get('product_id') or '').strip() if by_id else ''
+        if not pid:
+            if not by_key or not any((row.get(k) or '').strip() for k in NATURAL_KEY):
+                continue
+            if index is None:
+                index = catalog.get(fresh=True).index
+            try:
+                pid = index.lookup(*(row.get(k) or '' for k in NATURAL_KEY))
+            except ValueError:
+                pid = None
+            if pid is None:
+                result.rows += 1
+                result.error(line, 'No product for {} / {} / {}'.format(
+                    *(row.get(k) for k in NATURAL_KEY)))
+                continue
+        result.rows += 1
+        try:
+            qty = _parse_quantity(row.get('quantity'))
+        except ValueError:
+            result.error(line, f"Invalid quantity {row.get('quantity')!r}")
+            continue
+        chunk[pid] = (line, qty)
+        if len(chunk) >= CHUNK_SIZE:
+            _apply_chunk(chunk, result)
+            chunk = {}
+    if chunk:
+        _apply_chunk(chunk, result)
+
+    counters.bump(result.deltas)
+    if result.updated:
+        versions.bump('inventory')
+    return result
+
+
+def _apply_chunk(chunk, result):
+    """Bulk-update one chunk of {product_id: (line, quantity)}."""
+    rows = (db.session.query(
+                Inventory.id, Inventory.product_id, Inventory.quantity,
+                Inventory.reorder_level, Product.brand_id, Product.price,
+                Product.is_active)
+            .join(Product, Product.id == Inventory.product_id)
+            .filter(Inventory.product_id.in_(list(chunk)))
+            .all())
+    by_pid = {r.product_id: r for r in rows}
+
+    mappings = []
+    for pid, (line, qty) in chunk.items():
+        r = by_pid.get(pid)
+        if r is None:
+            result.error(line, f'Unknown product_id {pid}')
+            continue
+        mappings.append({'id': r.id, 'quantity': qty})
+        before = counters.row_contribution(r.brand_id, r.price, r.is_active,
+                                           r.quantity, r.reorder_level)
+        after = counters.row_contribution(r.brand_id, r.price, r.is_active,
+                                          qty, r.reorder_level)
+        result.deltas.update(counters.diff(before, after))
+
+    if mappings:
+        db.session.bulk_update_mappings(Inventory, mappings)
+        result.updated += len(mappings)
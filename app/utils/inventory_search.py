@@ -0,0 +1,137 @@
+"""Filtering, sorting and facet counts for the inventory listing.
+
+/api/inventory takes brand/variant/size ids, a stock state, a name query
+and a sort order, and all of it runs in SQL. A single GROUP BY over
+(brand, variant, size) with the stock-state and text filters applied
+yields the facet counts and the summary strip: the groups are small
+(one per catalog combination) and are folded in Python, each facet
+ignoring its own selection so the UI can show what picking another
+option would give.
+"""
+from app import db
+from app.models import Product, Inventory, Brand, Variant, Size
+from app.utils.stats import count_if
+
+
+STOCK_STATES = ('out', 'low', 'ok')
+
+SORT_COLUMNS = {
+    'name': Product.name,
+    'brand': Brand.name,
+    'variant': Variant.name,
+    'size': Size.size_inches,
+    'quantity': Inventory.quantity,
+    'reorder_level': Inventory.reorder_level,
+    'price': Product.price,
+}
+DEFAULT_SORT = 'brand,variant,size'
+
+# Query-string parameter -> product column
+DIMENSIONS = {
+    'brand': Product.brand_id,
+    'variant': Product.variant_id,
+    'size': Product.size_id,
+}
+
+
+def _qty():
+    return db.func.coalesce(Inventory.quantity, 0)
+
+
+def stock_state():
+    """SQL expression: 'out', 'low' or 'ok' for an inventory row."""
+    qty = _qty()
+    return db.case((qty <= 0, 'out'),
+                   (qty <= db.func.coalesce(Inventory.reorder_level, 0), 'low'),
+                   else_='ok')
+
+
+def _selection(args):
+    """{dimension: set of ids} for the brand/variant/size filters given."""
+    return {key: set(filter(None, args[key].split(',')))
+            for key in DIMENSIONS if args.get(key)}
+
+
+def _conditions(args):
+    """Filters other than brand/variant/size."""
+    conds = []
+    if args.get('stock'):
+        states = args['stock'].split(',')
+        unknown = set(states) - set(STOCK_STATES)
+        if unknown:
+            raise ValueError(f"stock must be one of {', '.join(STOCK_STATES)}")
+        conds.append(stock_state().in_(states))
+    if args.get('q', '').strip():
+        conds.append(Product.name.icontains(args['q'].strip(), autoescape=True))
+    return conds
+
+
+def _order_by(args):
+    order = []
+    for key in (args.get('sort') or DEFAULT_SORT).split(','):
+        key = key.strip()
+        desc = key.startswith('-')
+        column = SORT_COLUMNS.get(key.lstrip('-'))
+        if column is None:
+            raise ValueError(f"sort must be built from {', '.join(SORT_COLUMNS)}")
+        order.append(column.desc() if desc else column.asc())
+    order.append(Product.id)  # stable pages
+    return order
+
+
+def filter_inventory(query, args):
+    """Apply the /api/inventory filters and sort to ``inventory_query()``."""
+    for key, ids in _selection(args).items():
+        query = query.filter(DIMENSIONS[key].in_(ids))
+    return query.filter(*_conditions(args)).order_by(*_order_by(args))
+
+
+def facets(args):
+    """Facet counts per brand/variant/size and the summary of all matches."""
+    qty = _qty()
+    state = stock_state()
+    rows = (db.session.query(
+                Brand.id, Brand.name, Brand.code,
+                Variant.id, Variant.name,
+                Size.id, Size.size_inches,
+                db.func.count(Product.id),
+                db.func.coalesce(db.func.sum(qty), 0),
+                count_if(state == 'out'),
+                count_if(state == 'low'),
+            )
+            .select_from(Product)
+            .join(Product.inventory).join(Product.brand)
+            .join(Product.variant).join(Product.size)
+            .filter(*_conditions(args))
+            .group_by(Brand.id, Brand.name, Brand.code, Variant.id, Variant.name,
+                      Size.id, Size.size_inches)
+            .all())
+
+    selected = _selection(args)
+    labels = {'brand': {}, 'variant': {}, 'size': {}}
+    counts = {'brand': {}, 'variant': {}, 'size': {}}
+    summary = {'products': 0, 'units': 0, 'out': 0, 'low': 0, 'ok': 0}
+    for b_id, b_name, b_code, v_id, v_name, s_id, s_inches, n, units, out, low in rows:
+        ids = {'brand': b_id, 'variant': v_id, 'size': s_id}
+        labels['brand'][b_id] = {'id': b_id, 'name': b_name, 'code': b_code}
+        labels['variant'][v_id] = {'id': v_id, 'name': v_name}
+        labels['size'][s_id] = {'id': s_id, 'size_inches': s_inches}
+        misses = [key for key, chosen in selected.items() if ids[key] not in chosen]
+        for key in counts:
+            if not misses or misses == [key]:
+                counts[key][ids[key]] = counts[key].get(ids[key], 0) + n
+        if not misses:
+            summary['products'] += n
+            summary['units'] += int(units)
+            summary['out'] += int(out)
+            summary['low'] += int(low)
+            summary['ok'] += n - int(out) - int(low)
+
+    sort_keys = {'brand': lambda f: f['name'], 'variant': lambda f: f['name'],
+                 'size': lambda f: f['size_inches']}
+    result = {}
+    for key, plural in (('brand', 'brands'), ('variant', 'variants'), ('size', 'sizes')):
+        result[plural] = sorted(
+            ({**label, 'count': counts[key].get(id_, 0)} for id_, label in labels[key].items()),
+            key=sort_keys[key])
+    return result, summary
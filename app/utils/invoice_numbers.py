@@ -0,0 +1,107 @@
+"""Race-free invoice number allocation.
+
+Numbers look like ``KVM-YYYYMMDD-NNNN`` with a serial that restarts each
+day. The last serial issued per day lives in ``invoice_sequences`` and is
+advanced under a row lock — ``SELECT ... FOR UPDATE`` on PostgreSQL, and
+on SQLite by issuing the UPDATE first so the transaction takes the write
+lock up front, as BEGIN IMMEDIATE would. Allocating is one or two
+statements whatever the size of the invoices table, and two workers can
+never receive the same number.
+
+By default numbers are allocated inside the caller's transaction, so a
+rolled-back invoice leaves no gap. Setting INVOICE_NUMBER_BLOCK > 1 lets
+each worker reserve that many serials at once in a separate transaction
+and hand them out from memory; numbers then stay unique but may be
+issued out of order across workers and leave gaps on restart.
+"""
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import InvoiceSequence, Invoice
+
+
+PREFIX = 'KVM'
+
+_block_lock = threading.Lock()
+_blocks = {}  # day -> [next, end)
+
+
+def format_number(day, serial):
+    return f"{PREFIX}-{day}-{serial:04d}"
+
+
+def allocate_invoice_numbers(n, now=None):
+    """Return ``n`` consecutive unused invoice numbers for today."""
+    day = (now or datetime.utcnow()).strftime('%Y%m%d')
+    block = current_app.config.get('INVOICE_NUMBER_BLOCK', 1)
+    if block > 1:
+        serials = _from_block(day, n, block)
+    else:
+        last = _advance(db.session, day, n)
+        serials = range(last - n + 1, last + 1)
+    return [format_number(day, s) for s in serials]
+
+
+def _advance(session, day, n):
+    """Reserve ``n`` serials for ``day`` in ``session``; returns the last one."""
+    table = InvoiceSequence.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        current = session.execute(
+            db.select(table.c.last_value).where(table.c.day == day).with_for_update()
+        ).scalar()
+        if current is not None:
+            session.execute(table.update().where(table.c.day == day)
+                            .values(last_value=current + n))
+            return current + n
+    else:
+        result = session.execute(table.update().where(table.c.day == day)
+                                 .values(last_value=table.c.last_value + n))
+        if result.rowcount:
+            return session.execute(
+                db.select(table.c.last_value).where(table.c.day == day)
+            ).scalar()
+
+    # First invoice of the day: seed from any numbers already issued.
+    start = _highest_issued(session, day)
+    try:
+        with session.begin_nested():
+            session.execute(table.insert().values(day=day, last_value=start + n))
+        return start + n
+    except IntegrityError:
+        # Another worker created today's row first; go through the lock.
+        return _advance(session, day, n)
+
+
+def _highest_issued(session, day):
+    """Largest serial among ``day``'s invoice numbers, or 0.
+
+    Compared as integers: past 9999 the serial outgrows its padding and
+    text order would put ``...-9999`` after ``...-10000``.
+    """
+    prefix = format_number(day, 0)[:-4]
+    numbers = session.execute(
+        db.select(Invoice.invoice_number).where(Invoice.invoice_number.startswith(prefix))
+    ).scalars()
+    serials = [s for s in (n[len(prefix):] for n in numbers) if s.isdigit()]
+    return max(map(int, serials), default=0)
+
+
+def _from_block(day, n, block):
+    with _block_lock:
+        for stale in [d for d in _blocks if d != day]:
+            del _blocks[stale]
+        start, end = _blocks.get(day, (0, 0))
+        if end - start < n:
+            size = max(block, n)
+            # Reserve in its own transaction so the block survives a
+            # rollback of the invoice that triggered it.
+            with Session(db.engine) as session, session.begin():
+                last = _advance(session, day, size)
+            start, end = last - size + 1, last + 1
+        _blocks[day] = (start + n, end)
+        return range(start, start + n)
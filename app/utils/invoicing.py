@@ -0,0 +1,127 @@
+"""Invoice line parsing and totals shared by the single and batch invoice
+endpoints; the tax itself comes from app.utils.tax."""
+from flask import current_app
+
+from app.models import gen_uuid
+from app.utils import tax
+from app.utils.money import ZERO, to_decimal
+
+
+DEFAULT_HSN = '3917'
+
+
+def parse_items(items_data):
+    """Validate raw item payloads; returns a list of normalized dicts.
+
+    Raises ValueError naming the offending line.
+    """
+    if not items_data:
+        raise ValueError('Invoice has no items')
+    if not isinstance(items_data, list):
+        raise ValueError('items must be a list')
+    items = []
+    for n, item in enumerate(items_data, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f'Item {n} must be an object')
+        if not item.get('product_id'):
+            raise ValueError(f'Item {n}: product_id is required')
+        try:
+            items.append({
+                'product_id': item['product_id'],
+                'product_name': item.get('product_name', ''),
+                'hsn_code': str(item.get('hsn_code') or '').strip() or None,
+                'quantity': int(item.get('quantity', 1)),
+                'unit_price': to_decimal(item.get('unit_price', 0)),
+                'discount_percent': to_decimal(item.get('discount_percent', 0)),
+            })
+        except (TypeError, ValueError):
+            raise ValueError(f'Item {n}: quantity, unit_price and discount_percent must be numbers')
+    return items
+
+
+def check_products(items, products):
+    """ValueError unless every item's product is in ``products`` (id → product)."""
+    for n, i in enumerate(items, 1):
+        if i['product_id'] not in products:
+            raise ValueError(f"Item {n}: unknown product_id {i['product_id']!r}")
+    return items
+
+
+def fill_hsn(items, products):
+    """Default each item's HSN code to its product's; ``products`` maps id → product."""
+    for i in items:
+        if not i['hsn_code']:
+            product = products.get(i['product_id'])
+            i['hsn_code'] = (product.hsn_code if product else None) or DEFAULT_HSN
+    return items
+
+
+def assign_rates(items, table=None):
+    """Set ``gst_rate`` on every item from its HSN code (ValueError if unknown)."""
+    table = tax.rates() if table is None else table
+    for i in items:
+        i['gst_rate'] = tax.rate_for(i['hsn_code'], table)
+    return items
+
+
+def apply_amounts(items, interstate=False, groups=None, rounding=None):
+    """Fill gst_rate and taxable/cgst/sgst/igst/total on every item in one pass.
+
+    ``interstate`` is one bool for all lines or one per line, ``groups``
+    as for tax.compute_lines. ``rounding`` defaults to TAX_ROUNDING.
+    """
+    if isinstance(interstate, bool):
+        interstate = [interstate] * len(items)
+    assign_rates([i for i in items if 'gst_rate' not in i])
+    columns = tax.compute_lines(
+        [i['quantity'] for i in items],
+        [i['unit_price'] for i in items],
+        [i['discount_percent'] for i in items],
+        [i['gst_rate'] for i in items],
+        interstate,
+        groups=groups,
+        rounding=rounding or current_app.config.get('TAX_ROUNDING', tax.ROUND_PER_LINE),
+    )
+    keys = ('taxable_amount', 'cgst_amount', 'sgst_amount', 'igst_amount', 'total')
+    for i, amounts in zip(items, zip(*columns)):
+        i.update(zip(keys, amounts))
+    return items
+
+
+def invoice_totals(items):
+    """Header totals for items that already carry their amounts (exact sums)."""
+    subtotal = sum((i['taxable_amount'] for i in items), ZERO)
+    cgst_total = sum((i['cgst_amount'] for i in items), ZERO)
+    sgst_total = sum((i['sgst_amount'] for i in items), ZERO)
+    igst_total = sum((i['igst_amount'] for i in items), ZERO)
+    return {
+        'subtotal': subtotal,
+        'cgst_total': cgst_total,
+        'sgst_total': sgst_total,
+        'igst_total': igst_total,
+        'grand_total': subtotal + cgst_total + sgst_total + igst_total,
+    }
+
+
+def item_rows(invoice_id, items, products):
+    """InvoiceItem mappings for bulk insert; ``products`` maps id → Product."""
+    rows = []
+    for i in items:
+        product = products.get(i['product_id'])
+        rows.append({
+            'id': gen_uuid(),
+            'invoice_id': invoice_id,
+            'product_id': i['product_id'],
+            'product_name': product.name if product else i['product_name'],
+            'hsn_code': i['hsn_code'],
+            'quantity': i['quantity'],
+            'unit_price': i['unit_price'],
+            'discount_percent': i['discount_percent'],
+            'gst_rate': i['gst_rate'],
+            'taxable_amount': i['taxable_amount'],
+            'cgst_amount': i['cgst_amount'],
+            'sgst_amount': i['sgst_amount'],
+            'igst_amount': i['igst_amount'],
+            'total': i['total'],
+        })
+    return rows
@@ -0,0 +1,297 @@
+"""Background jobs backed by the ``jobs`` table.
+
+Slow work (PDF rendering, bulk exports, CSV imports) can be queued by
+the API, which answers 202 with the job id straight away; ``flask
+run-jobs`` starts worker processes that claim queued jobs and run the
+handlers registered with ``@task`` (see app.utils.tasks).
+
+A job is claimed with a conditional ``UPDATE ... WHERE status = 'queued'``
+so two workers can never take the same one; on PostgreSQL the candidate
+row is picked with ``FOR UPDATE SKIP LOCKED`` so idle workers do not
+queue up behind each other. Status, progress and heartbeats are written
+in their own short transactions, apart from the handler's work in
+``db.session``: they are visible while the job runs, and a failed job
+rolls back its work but keeps its error. SQLite allows one writer at a
+time, so while the handler has uncommitted writes there its progress is
+written through ``db.session`` instead (and shows once the handler
+commits), and a heartbeat that finds the database locked is skipped.
+A running job whose heartbeat
+is older than JOB_TIMEOUT seconds (its worker died) is queued again, up
+to JOB_MAX_ATTEMPTS runs.
+
+Files produced by jobs live in JOB_RESULT_DIR and are removed together
+with the job JOB_RESULT_TTL hours after it finished.
+"""
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Job, gen_uuid
+
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+MAINTENANCE_INTERVAL = 60  # seconds between stale-job / purge sweeps
+
+log = logging.getLogger(__name__)
+
+_tasks = {}
+_stop = threading.Event()
+
+
+def task(kind):
+    """Register the decorated function as the handler for ``kind`` jobs.
+
+    Handlers are called as ``fn(ctx, **params)`` with a JobContext and
+    return a JSON-serialisable result; their ``db.session`` work is
+    committed when they return.
+    """
+    def register(fn):
+        _tasks[kind] = fn
+        return fn
+    return register
+
+
+def _load_tasks():
+    import app.utils.tasks  # noqa: F401  (registers the handlers)
+
+
+def enqueue(kind, **params):
+    """Queue a job and commit it so workers can pick it up."""
+    _load_tasks()
+    if kind not in _tasks:
+        raise ValueError(f'Unknown job kind: {kind}')
+    job = Job(kind=kind, status=QUEUED, params=json.dumps(params))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+# ─────────────────────────── Files ───────────────────────────────────────────
+
+def result_dir():
+    path = current_app.config.get('JOB_RESULT_DIR') or \
+        os.path.join(current_app.instance_path, 'job_results')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def result_file(job):
+    """(path, download name, mimetype) of a job's result file, or None."""
+    result = json.loads(job.result) if job.result else None
+    if not isinstance(result, dict) or 'file' not in result:
+        return None
+    return (os.path.join(result_dir(), result['file']),
+            result.get('filename') or result['file'], result.get('mimetype'))
+
+
+def save_input(stream, suffix=''):
+    """Copy an uploaded stream to the job directory; returns its file name."""
+    name = f'input-{gen_uuid()}{suffix}'
+    with open(os.path.join(result_dir(), name), 'wb') as fh:
+        while True:
+            chunk = stream.read(64 * 1024)
+            if not chunk:
+                break
+            fh.write(chunk)
+    return name
+
+
+class JobContext:
+    """Handed to task handlers to report progress and store files."""
+
+    PROGRESS_INTERVAL = 0.5  # seconds; progress writes are throttled
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._reported = 0.0
+
+    def progress(self, done, total=None):
+        now = time.monotonic()
+        if now - self._reported < self.PROGRESS_INTERVAL and done != total:
+            return
+        self._reported = now
+        values = {'progress': done, 'heartbeat_at': datetime.utcnow()}
+        if total is not None:
+            values['total'] = total
+        if _holds_write_lock():
+            db.session.execute(db.update(Job).where(Job.id == self.job_id).values(**values))
+        else:
+            _update(self.job_id, **values)
+
+    def input_path(self, name):
+        return os.path.join(result_dir(), os.path.basename(name))
+
+    def save(self, chunks, filename, mimetype):
+        """Write ``chunks`` (bytes iterable) as the job's result file."""
+        ext = os.path.splitext(filename)[1]
+        name = f'{self.job_id}{ext}'
+        fd, tmp = tempfile.mkstemp(dir=result_dir(), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        os.replace(tmp, os.path.join(result_dir(), name))
+        return {'file': name, 'filename': filename, 'mimetype': mimetype}
+
+
+# ─────────────────────────── Worker ──────────────────────────────────────────
+
+def _holds_write_lock():
+    """True when ``db.session`` has uncommitted writes on SQLite, which a
+    write from another connection would have to wait for."""
+    session = db.session()
+    if not session.in_transaction() or session.get_bind().dialect.name != 'sqlite':
+        return False
+    return session.connection().connection.dbapi_connection.in_transaction
+
+
+def _update(job_id, *where, **values):
+    """Write job columns in a transaction of their own."""
+    with Session(db.engine) as session, session.begin():
+        result = session.execute(
+            db.update(Job).where(Job.id == job_id, *where).values(**values))
+        return result.rowcount
+
+
+def claim(worker):
+    """Mark the oldest queued job as running for ``worker``; returns its id."""
+    while True:
+        with Session(db.engine) as session, session.begin():
+            query = (db.select(Job.id).where(Job.status == QUEUED)
+                     .order_by(Job.created_at).limit(1))
+            if session.get_bind().dialect.name == 'postgresql':
+                query = query.with_for_update(skip_locked=True)
+            job_id = session.execute(query).scalar()
+            if job_id is None:
+                return None
+            now = datetime.utcnow()
+            taken = session.execute(
+                db.update(Job)
+                .where(Job.id == job_id, Job.status == QUEUED)
+                .values(status=RUNNING, worker=worker, attempts=Job.attempts + 1,
+                        progress=0, started_at=now, heartbeat_at=now)
+            ).rowcount
+        if taken:
+            return job_id
+        # Another worker got there first; try the next one.
+
+
+def _heartbeat(app, job_id, done):
+    interval = max(1, app.config.get('JOB_TIMEOUT', 600) // 4)
+    with app.app_context():
+        while not done.wait(interval):
+            try:
+                _update(job_id, Job.status == RUNNING, heartbeat_at=datetime.utcnow())
+            except OperationalError:
+                # SQLite: the handler holds the write lock; beat next time
+                log.debug('Heartbeat of job %s skipped', job_id, exc_info=True)
+
+
+def run(job_id):
+    """Run a claimed job and record its result or error."""
+    _load_tasks()
+    job = db.session.get(Job, job_id)
+    kind, params = job.kind, json.loads(job.params or '{}')
+    db.session.rollback()
+
+    done = threading.Event()
+    beat = threading.Thread(target=_heartbeat, daemon=True,
+                            args=(current_app._get_current_object(), job_id, done))
+    beat.start()
+    try:
+        handler = _tasks.get(kind)
+        if handler is None:
+            raise ValueError(f'Unknown job kind: {kind}')
+        result = handler(JobContext(job_id), **params)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        log.exception('Job %s (%s) failed', job_id, kind)
+        _update(job_id, Job.status == RUNNING, status=FAILED,
+                error=str(e) or e.__class__.__name__, finished_at=datetime.utcnow())
+        return False
+    finally:
+        done.set()
+        db.session.remove()
+
+    _update(job_id, Job.status == RUNNING, status=DONE,
+            result=None if result is None else json.dumps(result),
+            finished_at=datetime.utcnow())
+    return True
+
+
+def requeue_stale():
+    """Put jobs of dead workers back in the queue (or fail them)."""
+    cfg = current_app.config
+    now = datetime.utcnow()
+    stale = (Job.status == RUNNING,
+             Job.heartbeat_at < now - timedelta(seconds=cfg.get('JOB_TIMEOUT', 600)))
+    with Session(db.engine) as session, session.begin():
+        session.execute(
+            db.update(Job)
+            .where(*stale, Job.attempts >= cfg.get('JOB_MAX_ATTEMPTS', 3))
+            .values(status=FAILED, error='Worker stopped responding', finished_at=now))
+        session.execute(db.update(Job).where(*stale).values(status=QUEUED, worker=None))
+
+
+def purge():
+    """Delete finished jobs past JOB_RESULT_TTL and their files."""
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config.get('JOB_RESULT_TTL', 24))
+    old = Job.query.filter(Job.status.in_((DONE, FAILED)), Job.finished_at < cutoff).all()
+    for job in old:
+        found = result_file(job)
+        if found:
+            try:
+                os.remove(found[0])
+            except OSError:
+                pass
+        db.session.delete(job)
+    db.session.commit()
+    return len(old)
+
+
+def stop(*_):
+    """Ask ``work`` to return after the current job (usable as a signal handler)."""
+    _stop.set()
+
+
+def work(once=False, worker=None):
+    """Claim and run jobs until stopped (or, with ``once``, the queue is empty)."""
+    _load_tasks()
+    worker = worker or f'{socket.gethostname()}:{os.getpid()}'
+    poll = current_app.config.get('JOB_POLL_INTERVAL', 1.0)
+    swept = 0.0
+    while not _stop.is_set():
+        if time.monotonic() - swept > MAINTENANCE_INTERVAL:
+            requeue_stale()
+            purge()
+            swept = time.monotonic()
+        job_id = claim(worker)
+        if job_id is None:
+            if once:
+                return
+            _stop.wait(poll)
+            continue
+        run(job_id)
+
+
+def worker_main(config_name, once=False):
+    """Entry point of a spawned worker process."""
+    import signal
+    from app import create_app
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    app = create_app(config_name)
+    with app.app_context():
+        work(once=once)
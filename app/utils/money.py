@@ -0,0 +1,52 @@
+"""Exact money arithmetic.
+
+Amounts are ``Decimal`` rupees with two places (paise), stored in
+``Numeric(12, 2)`` columns, so a total summed in SQL is exactly the sum
+of the stored lines. Rounding is half-up to the paisa.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_FLOOR, ROUND_HALF_UP
+
+
+PAISE = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def to_decimal(value):
+    """Decimal from a JSON/CSV value; floats go through str() so 0.1 stays 0.1.
+
+    Raises ValueError for anything that is not a finite number.
+    """
+    if isinstance(value, Decimal):
+        result = value
+    else:
+        try:
+            result = Decimal(str(value).strip() if value is not None else '')
+        except InvalidOperation:
+            raise ValueError(f'{value!r} is not a number')
+    if not result.is_finite():
+        raise ValueError(f'{value!r} is not a number')
+    return result
+
+
+def round_paise(value):
+    return value.quantize(PAISE, rounding=ROUND_HALF_UP)
+
+
+def spread(raw_amounts, total):
+    """Round ``raw_amounts`` to paise so that they add up to ``total``.
+
+    Each amount is rounded down and the paise left over go to the
+    amounts with the largest remainders (largest remainder method).
+    """
+    floors = [a.quantize(PAISE, rounding=ROUND_FLOOR) for a in raw_amounts]
+    left = int((total - sum(floors, ZERO)) / PAISE)
+    by_remainder = sorted(range(len(floors)),
+                          key=lambda i: raw_amounts[i] - floors[i], reverse=True)
+    for i in by_remainder[:left]:
+        floors[i] += PAISE
+    return floors
+
+
+def as_float(value):
+    """JSON-friendly float for a Numeric column value (None stays None)."""
+    return float(value) if value is not None else None
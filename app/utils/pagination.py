@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime, timedelta
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(args, default=DEFAULT_PAGE_SIZE):
+    """Read ?limit= from the query string, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        limit = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def page_offset(args):
+    """Read ?offset= from the query string (>= 0)."""
+    try:
+        offset = int(args.get('offset', 0))
+    except (TypeError, ValueError):
+        raise ValueError('offset must be an integer')
+    return max(0, offset)
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque keyset cursor for a (created_at, id) position."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8')
+        ts, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(ts), row_id
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_date_range(args):
+    """Return (start, end) datetimes for ?from=YYYY-MM-DD&to=YYYY-MM-DD.
+
+    `end` is exclusive (the day after `to`) so callers can filter with
+    ``col >= start AND col < end`` and keep the predicate index friendly.
+    """
+    start = end = None
+    try:
+        if args.get('from'):
+            start = datetime.strptime(args['from'], '%Y-%m-%d')
+        if args.get('to'):
+            end = datetime.strptime(args['to'], '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        raise ValueError('Dates must be in YYYY-MM-DD format')
+    return start, end
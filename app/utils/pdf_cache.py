@@ -0,0 +1,112 @@
+"""On-disk cache of rendered invoice PDFs.
+
+Entries are keyed by invoice id plus a hash of everything printed on the
+PDF (invoice fields, customer, items and the layout version), so any
+change to the invoice yields a new key and a stale file is never served.
+The hash doubles as the HTTP ETag: a client that already holds the
+current version gets a 304 without the PDF being rendered or read.
+
+Files live in PDF_CACHE_DIR and the directory is kept under
+PDF_CACHE_MAX_BYTES by evicting least recently used files, recency
+being tracked through the file mtime (refreshed on every hit).
+"""
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+from flask import current_app
+
+from app.utils.pdf_generator import COMPANY, PDF_LAYOUT_VERSION
+
+
+def content_hash(invoice):
+    payload = {
+        'layout': PDF_LAYOUT_VERSION,
+        'company': COMPANY,
+        'invoice': invoice.to_dict(),
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _cache_dir():
+    path = current_app.config.get('PDF_CACHE_DIR') or \
+        os.path.join(current_app.instance_path, 'pdf_cache')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _path(invoice_id, digest):
+    return os.path.join(_cache_dir(), f'{invoice_id}-{digest[:32]}.pdf')
+
+
+def enabled():
+    return current_app.config.get('PDF_CACHE_ENABLED', True)
+
+
+def get(invoice_id, digest):
+    """Open file of the cached PDF, or None on a miss.
+
+    An open handle stays readable even if another worker evicts the file
+    before it has been sent.
+    """
+    path = _path(invoice_id, digest)
+    try:
+        fh = open(path, 'rb')
+    except OSError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return fh
+
+
+def put(invoice_id, digest, buf):
+    """Store the rendered PDF buffer; returns it rewound for sending."""
+    path = _path(invoice_id, digest)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as fh:
+        fh.write(buf.getbuffer())
+    os.replace(tmp, path)
+    invalidate(invoice_id, keep=path)
+    _evict(keep=path)
+    buf.seek(0)
+    return buf
+
+
+def invalidate(invoice_id, keep=None):
+    """Remove cached PDFs of an invoice (except ``keep``)."""
+    for path in glob.glob(os.path.join(_cache_dir(), f'{glob.escape(invoice_id)}-*.pdf')):
+        if path != keep:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _evict(keep=None):
+    limit = current_app.config.get('PDF_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+    entries = []
+    total = 0
+    for entry in os.scandir(_cache_dir()):
+        if not entry.name.endswith('.pdf') or entry.path == keep:
+            continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, entry.path))
+        total += st.st_size
+    if total <= limit:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= limit:
+            break
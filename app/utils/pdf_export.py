@@ -0,0 +1,163 @@
+"""Bulk invoice PDF export.
+
+Invoices are loaded up front with their customer and items, converted to
+plain picklable snapshots, and rendered by ``generate_invoice_pdf`` in a
+process pool. Results are streamed to the client in invoice order as
+they come back: into a ZIP written on the fly, or appended to a merged
+PDF that is spooled to a temporary file and streamed once complete (the
+PDF format needs its cross-reference table written last).
+"""
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+from app.utils.pdf_generator import generate_invoice_pdf
+
+
+CHUNK_SIZE = 64 * 1024
+
+MIMETYPES = {'zip': 'application/zip', 'pdf': 'application/pdf'}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def snapshot(invoice):
+    """Detached copy of an invoice with everything the PDF prints."""
+    c = invoice.customer
+    customer = SimpleNamespace(
+        name=c.name, address=c.address, city=c.city, state=c.state,
+        pincode=c.pincode, gstin=c.gstin, phone=c.phone,
+    ) if c else None
+    items = [SimpleNamespace(
+        product_name=i.product_name, hsn_code=i.hsn_code, quantity=i.quantity,
+        unit_price=i.unit_price, discount_percent=i.discount_percent,
+        gst_rate=i.gst_rate, taxable_amount=i.taxable_amount, cgst_amount=i.cgst_amount,
+        sgst_amount=i.sgst_amount, igst_amount=i.igst_amount, total=i.total,
+    ) for i in invoice.items]
+    return SimpleNamespace(
+        id=invoice.id, invoice_number=invoice.invoice_number,
+        invoice_date=invoice.invoice_date, status=invoice.status,
+        notes=invoice.notes, place_of_supply=invoice.place_of_supply,
+        subtotal=invoice.subtotal, cgst_total=invoice.cgst_total,
+        sgst_total=invoice.sgst_total, igst_total=invoice.igst_total,
+        grand_total=invoice.grand_total, customer=customer, items=items,
+    )
+
+
+def load_snapshots(args):
+    """Snapshots of the invoices matching the list filters in ``args``.
+
+    Raises ValueError for bad filters or more than PDF_EXPORT_MAX_INVOICES
+    matches.
+    """
+    from flask import current_app
+    from app.models import Invoice
+    from app.utils.queries import invoice_export_query, filter_invoices
+
+    query = filter_invoices(invoice_export_query(), args)
+    limit = current_app.config.get('PDF_EXPORT_MAX_INVOICES', 2000)
+    invoices = query.order_by(Invoice.invoice_date, Invoice.invoice_number).limit(limit + 1).all()
+    if len(invoices) > limit:
+        raise ValueError(f'More than {limit} invoices; narrow the date range')
+    return [snapshot(inv) for inv in invoices]
+
+
+def _render(snap):
+    return snap.invoice_number, generate_invoice_pdf(snap).getvalue()
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: children must not inherit the parent's DB connections
+            ctx = multiprocessing.get_context('spawn')
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        return _pool
+
+
+def render_all(snapshots, workers, progress=None):
+    """Yield (invoice_number, pdf_bytes) in order, rendering in parallel.
+
+    ``progress(done, total)`` is called after each invoice.
+    """
+    if workers <= 1 or len(snapshots) <= 1:
+        results = map(_render, snapshots)
+    else:
+        results = _get_pool(workers).map(_render, snapshots, chunksize=4)
+    for done, result in enumerate(results, 1):
+        yield result
+        if progress:
+            progress(done, len(snapshots))
+
+
+class _Pipe(io.RawIOBase):
+    """Write-only stream whose contents are drained by a generator."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(snapshots, workers, progress=None):
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for number, pdf in render_all(snapshots, workers, progress):
+            zf.writestr(f'{number}.pdf', pdf)
+            data = pipe.drain()
+            if data:
+                yield data
+    yield pipe.drain()
+
+
+def stream_merged(snapshots, workers, progress=None):
+    from PyPDF2 import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for number, pdf in render_all(snapshots, workers, progress):
+        reader = PdfReader(io.BytesIO(pdf))
+        for page in reader.pages:
+            writer.add_page(page)
+        writer.add_outline_item(number, len(writer.pages) - len(reader.pages))
+
+    with tempfile.TemporaryFile() as fh:
+        writer.write(fh)
+        fh.seek(0)
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def stream(snapshots, fmt, workers, progress=None):
+    """Body chunks of the export in ``fmt`` ('zip' or 'pdf')."""
+    if fmt == 'zip':
+        return stream_zip(snapshots, workers, progress)
+    return stream_merged(snapshots, workers, progress)
+
+
+def filename(args, fmt):
+    period = '_'.join(filter(None, (args.get('from'), args.get('to')))) or 'all'
+    return f'invoices_{period}.{fmt}'
+
+
+def default_workers():
+    return min(4, os.cpu_count() or 1)
@@ -1,47 +1,279 @@
+import copy
 import io
+from decimal import Decimal
+
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer,
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak,
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT
 
+from app.utils.tax import COMPANY_GSTIN, STATES, is_interstate
+
+
+# Bump whenever the rendered output changes so cached PDFs are replaced.
+PDF_LAYOUT_VERSION = 3
 
 COMPANY = {
     'name': 'KVM ENTERPRISES',
     'address': '#6, Karumai Amman Kovil Street, Vadapalani, Chennai, Tamil Nadu 600026',
     'phone': '9884243950',
-    'gstin': '33EFMPS7293G1ZT',
+    'gstin': COMPANY_GSTIN,
+}
+
+TERMS = [
+    '1. Goods once sold will not be taken back.',
+    '2. Payment due within 30 days of invoice date.',
+    '3. Subject to Chennai jurisdiction.',
+]
+
+# interstate -> (item table header, column width fractions)
+ITEM_LAYOUTS = {
+    False: (['#', 'Product', 'HSN', 'Qty', 'Rate (₹)', 'Disc %', 'Taxable (₹)', 'GST %',
+             'CGST (₹)', 'SGST (₹)', 'Total (₹)'],
+            [0.04, 0.2, 0.07, 0.05, 0.09, 0.06, 0.1, 0.06, 0.09, 0.09, 0.15]),
+    True: (['#', 'Product', 'HSN', 'Qty', 'Rate (₹)', 'Disc %', 'Taxable (₹)', 'GST %',
+            'IGST (₹)', 'Total (₹)'],
+           [0.04, 0.25, 0.07, 0.05, 0.1, 0.06, 0.12, 0.06, 0.11, 0.14]),
 }
 
+PAGE_MARGIN = 15 * mm
+FRAME_PADDING = 6  # SimpleDocTemplate's default frame padding, points
+
+# Invoices with more lines than this are laid out page by page, see
+# _paged_items_tables().
+LARGE_INVOICE_LINES = 40
+
+
+class InvoiceTemplate:
+    """Everything about the invoice layout that does not depend on the invoice.
+
+    Styles, table styles, column widths and the static header/terms
+    paragraphs are built once per process; each render only adds the
+    invoice-specific flowables. Static flowables are handed out as
+    shallow copies because ReportLab stores layout state on them.
+    """
+
+    def __init__(self):
+        self.width = A4[0] - 2 * PAGE_MARGIN
+
+        styles = getSampleStyleSheet()
+        self.title = ParagraphStyle('title', parent=styles['Heading1'],
+                                    alignment=TA_CENTER, fontSize=16, spaceAfter=2)
+        self.subtitle = ParagraphStyle('sub', parent=styles['Normal'],
+                                       alignment=TA_CENTER, fontSize=9, spaceAfter=4)
+        self.normal = styles['Normal']
+        self.bold = ParagraphStyle('bold', parent=self.normal, fontName='Helvetica-Bold')
+        self.right = ParagraphStyle('right', parent=self.normal, alignment=TA_RIGHT)
+        self.heading = ParagraphStyle('inv', parent=styles['Heading2'], alignment=TA_CENTER)
+        self.term = ParagraphStyle('term', parent=self.normal, fontSize=8)
+
+        self.frame_height = A4[1] - 2 * PAGE_MARGIN - 2 * FRAME_PADDING
+        self.info_cols = [self.width * 0.6, self.width * 0.4]
+        self.item_headers = {k: header for k, (header, _) in ITEM_LAYOUTS.items()}
+        self.item_cols = {k: [self.width * w for w in fractions]
+                          for k, (_, fractions) in ITEM_LAYOUTS.items()}
+        self.totals_cols = [self.width * 0.35, self.width * 0.25, self.width * 0.2, self.width * 0.2]
+
+        self.info_style = TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.items_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ])
+        self.carry_style = [
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#dfe6ee')),
+        ]
+        self.totals_style = TableStyle([
+            ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('LINEABOVE', (2, -1), (-1, -1), 1, colors.black),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+        ])
+
+        self._header = [
+            Paragraph(COMPANY['name'], self.title),
+            Paragraph(COMPANY['address'], self.subtitle),
+            Paragraph(f"Phone: {COMPANY['phone']}  |  GSTIN: {COMPANY['gstin']}", self.subtitle),
+            Spacer(1, 6 * mm),
+            Paragraph('<b>TAX INVOICE</b>', self.heading),
+            Spacer(1, 4 * mm),
+        ]
+        self._terms = [Paragraph('<b>Terms & Conditions:</b>', self.bold)]
+        self._terms += [Paragraph(t, self.term) for t in TERMS]
+        self._terms.append(Spacer(1, 12 * mm))
+        self._sig_for = Paragraph('<b>For KVM ENTERPRISES</b>', self.right)
+        self._sig_label = Paragraph('Authorized Signatory', self.right)
+        self._empty = Paragraph('', self.normal)
+
+        # Item rows are single-line strings, so every row has the same height.
+        header = self.item_headers[False]
+        probe = Table([header, header], colWidths=self.item_cols[False])
+        probe.setStyle(self.items_style)
+        self.item_row_height = probe.wrap(self.width, self.frame_height)[1] / 2
+
+    def header(self):
+        return [copy.copy(f) for f in self._header]
+
+    def terms(self):
+        return [copy.copy(f) for f in self._terms]
+
+    def signature(self):
+        sig_data = [['', copy.copy(self._sig_for)],
+                    ['', ''],
+                    ['', copy.copy(self._sig_label)]]
+        return Table(sig_data, colWidths=self.info_cols)
+
+    def empty(self):
+        return copy.copy(self._empty)
+
+    def carry_rows(self, row):
+        """Style commands that make ``row`` a carried/brought forward line."""
+        return [(cmd, (c0, row), (c1, row), *rest)
+                for cmd, (c0, _), (c1, _), *rest in self.carry_style]
+
+    def new_document(self, sink):
+        return SimpleDocTemplate(sink, pagesize=A4,
+                                 leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN,
+                                 topMargin=PAGE_MARGIN, bottomMargin=PAGE_MARGIN)
+
+
+def _pct(rate):
+    """9.00 -> '9', 2.50 -> '2.5'."""
+    return f"{Decimal(rate).normalize():f}" if rate is not None else ''
+
+
+def _item_row(idx, item, interstate):
+    if interstate:
+        tax = [f"{item.igst_amount:,.2f}"]
+    else:
+        tax = [f"{item.cgst_amount:,.2f}", f"{item.sgst_amount:,.2f}"]
+    return [
+        str(idx),
+        item.product_name or '',
+        item.hsn_code or '',
+        str(item.quantity),
+        f"{item.unit_price:,.2f}",
+        f"{item.discount_percent:.1f}",
+        f"{item.taxable_amount:,.2f}",
+        _pct(item.gst_rate),
+        *tax,
+        f"{item.total:,.2f}",
+    ]
+
+
+def _carry_row(label, interstate, qty, taxable, cgst, sgst, igst, total):
+    tax = [f"{igst:,.2f}"] if interstate else [f"{cgst:,.2f}", f"{sgst:,.2f}"]
+    return ['', label, '', str(qty), '', '', f"{taxable:,.2f}", '', *tax, f"{total:,.2f}"]
+
+
+def _items_table(t, items, interstate):
+    table_data = [t.item_headers[interstate]]
+    table_data.extend(_item_row(idx, item, interstate) for idx, item in enumerate(items, 1))
+    items_table = Table(table_data, colWidths=t.item_cols[interstate], repeatRows=1)
+    items_table.setStyle(t.items_style)
+    return [items_table]
+
+
+def _paged_items_tables(t, items, interstate, first_page_space):
+    """One table per page for large invoices.
+
+    ReportLab lays out one big table by splitting it again and again,
+    which gets slow as rows grow. Here each page gets its own table of
+    exactly the rows that fit, with the header repeated and running
+    totals carried forward to the next page, so time and memory stay
+    linear in the line count.
+    """
+    per_page = int(t.frame_height // t.item_row_height) - 3
+    first = int(first_page_space // t.item_row_height) - 3
+
+    flowables = []
+    if first < 5:
+        flowables.append(PageBreak())
+        first = per_page
+
+    running = [0, 0, 0, 0, 0, 0]
+    start, size = 0, first
+    while start < len(items):
+        chunk = items[start:start + size]
+        data = [t.item_headers[interstate]]
+        style = TableStyle(t.items_style.getCommands())
+        if start:
+            for cmd in t.carry_rows(len(data)):
+                style.add(*cmd)
+            data.append(_carry_row('Brought forward', interstate, *running))
+        for idx, item in enumerate(chunk, start + 1):
+            data.append(_item_row(idx, item, interstate))
+            running[0] += item.quantity or 0
+            running[1] += item.taxable_amount or 0
+            running[2] += item.cgst_amount or 0
+            running[3] += item.sgst_amount or 0
+            running[4] += item.igst_amount or 0
+            running[5] += item.total or 0
+        start += len(chunk)
+        last = start >= len(items)
+        if not last:
+            for cmd in t.carry_rows(len(data)):
+                style.add(*cmd)
+            data.append(_carry_row('Carried forward', interstate, *running))
+
+        table = Table(data, colWidths=t.item_cols[interstate])
+        table.setStyle(style)
+        flowables.append(table)
+        if not last:
+            flowables.append(PageBreak())
+        size = per_page
+    return flowables
+
+
+def _height(flowables, width, avail):
+    used = 0
+    for f in flowables:
+        used += f.wrap(width, avail)[1] + f.getSpaceBefore() + f.getSpaceAfter()
+    return used
+
+
+_template = None
+
 
-def generate_invoice_pdf(invoice):
+def get_template():
+    """The process-wide InvoiceTemplate, built on first use."""
+    global _template
+    if _template is None:
+        _template = InvoiceTemplate()
+    return _template
+
+
+def generate_invoice_pdf(invoice, template=None):
     """Return a BytesIO buffer containing the invoice PDF."""
     buf = io.BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4,
-                            leftMargin=15 * mm, rightMargin=15 * mm,
-                            topMargin=15 * mm, bottomMargin=15 * mm)
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle('title', parent=styles['Heading1'],
-                                 alignment=TA_CENTER, fontSize=16, spaceAfter=2)
-    subtitle_style = ParagraphStyle('sub', parent=styles['Normal'],
-                                    alignment=TA_CENTER, fontSize=9, spaceAfter=4)
-    normal = styles['Normal']
-    bold = ParagraphStyle('bold', parent=normal, fontName='Helvetica-Bold')
-    right = ParagraphStyle('right', parent=normal, alignment=TA_RIGHT)
-
-    elements = []
-
-    # ── Header ───────────────────────────────────────────────────────────
-    elements.append(Paragraph(COMPANY['name'], title_style))
-    elements.append(Paragraph(COMPANY['address'], subtitle_style))
-    elements.append(Paragraph(f"Phone: {COMPANY['phone']}  |  GSTIN: {COMPANY['gstin']}", subtitle_style))
-    elements.append(Spacer(1, 6 * mm))
-    elements.append(Paragraph('<b>TAX INVOICE</b>', ParagraphStyle('inv', parent=styles['Heading2'], alignment=TA_CENTER)))
-    elements.append(Spacer(1, 4 * mm))
+    render_invoice_pdf(invoice, buf, template)
+    buf.seek(0)
+    return buf
+
+
+def render_invoice_pdf(invoice, sink, template=None):
+    """Render the invoice PDF into ``sink`` (a path or writable file object)."""
+    t = template or get_template()
+    doc = t.new_document(sink)
+    normal, right = t.normal, t.right
+
+    elements = t.header()
 
     # ── Invoice info ─────────────────────────────────────────────────────
     customer = invoice.customer
@@ -55,71 +287,45 @@ def generate_invoice_pdf(invoice):
     ]
     if customer:
         addr_parts = [p for p in [customer.address, customer.city, customer.state, customer.pincode] if p]
-        info_data.append([Paragraph(', '.join(addr_parts), normal), Paragraph('', normal)])
+        info_data.append([Paragraph(', '.join(addr_parts), normal), t.empty()])
         if customer.gstin:
-            info_data.append([Paragraph(f"<b>GSTIN:</b> {customer.gstin}", normal), Paragraph('', normal)])
+            info_data.append([Paragraph(f"<b>GSTIN:</b> {customer.gstin}", normal), t.empty()])
         if customer.phone:
-            info_data.append([Paragraph(f"<b>Phone:</b> {customer.phone}", normal), Paragraph('', normal)])
+            info_data.append([Paragraph(f"<b>Phone:</b> {customer.phone}", normal), t.empty()])
+    if invoice.place_of_supply:
+        place = f"{invoice.place_of_supply} - {STATES.get(invoice.place_of_supply, '')}"
+        info_data.append([Paragraph(f"<b>Place of Supply:</b> {place}", normal), t.empty()])
 
-    info_table = Table(info_data, colWidths=[doc.width * 0.6, doc.width * 0.4])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    info_table = Table(info_data, colWidths=t.info_cols)
+    info_table.setStyle(t.info_style)
     elements.append(info_table)
     elements.append(Spacer(1, 6 * mm))
 
     # ── Items table ──────────────────────────────────────────────────────
-    header = ['#', 'Product', 'HSN', 'Qty', 'Rate (₹)', 'Disc %', 'Taxable (₹)', 'CGST (₹)', 'SGST (₹)', 'Total (₹)']
-    table_data = [header]
-
-    for idx, item in enumerate(invoice.items, 1):
-        table_data.append([
-            str(idx),
-            item.product_name or '',
-            item.hsn_code or '',
-            str(item.quantity),
-            f"{item.unit_price:,.2f}",
-            f"{item.discount_percent:.1f}",
-            f"{item.taxable_amount:,.2f}",
-            f"{item.cgst_amount:,.2f}",
-            f"{item.sgst_amount:,.2f}",
-            f"{item.total:,.2f}",
-        ])
-
-    col_widths = [doc.width * w for w in [0.04, 0.22, 0.07, 0.06, 0.1, 0.07, 0.11, 0.1, 0.1, 0.13]]
-    items_table = Table(table_data, colWidths=col_widths, repeatRows=1)
-    items_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, -1), 3),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-    ]))
-    elements.append(items_table)
+    items = list(invoice.items)
+    interstate = is_interstate(invoice.place_of_supply)
+    if len(items) > LARGE_INVOICE_LINES:
+        space = t.frame_height - _height(elements, t.width, t.frame_height)
+        elements.extend(_paged_items_tables(t, items, interstate, space))
+    else:
+        elements.extend(_items_table(t, items, interstate))
     elements.append(Spacer(1, 6 * mm))
 
     # ── Totals ───────────────────────────────────────────────────────────
-    totals_data = [
-        ['', '', 'Subtotal:', f"₹ {invoice.subtotal:,.2f}"],
-        ['', '', 'CGST (9%):', f"₹ {invoice.cgst_total:,.2f}"],
-        ['', '', 'SGST (9%):', f"₹ {invoice.sgst_total:,.2f}"],
-        ['', '', 'Grand Total:', f"₹ {invoice.grand_total:,.2f}"],
-    ]
-    totals_table = Table(totals_data,
-                         colWidths=[doc.width * 0.35, doc.width * 0.25, doc.width * 0.2, doc.width * 0.2])
-    totals_table.setStyle(TableStyle([
-        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
-        ('FONTNAME', (2, -1), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('LINEABOVE', (2, -1), (-1, -1), 1, colors.black),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
-    ]))
+    # Show the rate in the label when every line shares it
+    rates = {item.gst_rate for item in items}
+    rate = rates.pop() if len(rates) == 1 else None
+    totals_data = [['', '', 'Subtotal:', f"₹ {invoice.subtotal:,.2f}"]]
+    if interstate:
+        label = f" ({_pct(rate)}%)" if rate is not None else ''
+        totals_data.append(['', '', f'IGST{label}:', f"₹ {invoice.igst_total:,.2f}"])
+    else:
+        label = f" ({_pct(rate / 2)}%)" if rate is not None else ''
+        totals_data.append(['', '', f'CGST{label}:', f"₹ {invoice.cgst_total:,.2f}"])
+        totals_data.append(['', '', f'SGST{label}:', f"₹ {invoice.sgst_total:,.2f}"])
+    totals_data.append(['', '', 'Grand Total:', f"₹ {invoice.grand_total:,.2f}"])
+    totals_table = Table(totals_data, colWidths=t.totals_cols)
+    totals_table.setStyle(t.totals_style)
     elements.append(totals_table)
     elements.append(Spacer(1, 10 * mm))
 
@@ -128,24 +334,8 @@ def generate_invoice_pdf(invoice):
         elements.append(Paragraph(f"<b>Notes:</b> {invoice.notes}", normal))
         elements.append(Spacer(1, 4 * mm))
 
-    # ── Terms ────────────────────────────────────────────────────────────
-    elements.append(Paragraph('<b>Terms & Conditions:</b>', bold))
-    terms = [
-        '1. Goods once sold will not be taken back.',
-        '2. Payment due within 30 days of invoice date.',
-        '3. Subject to Chennai jurisdiction.',
-    ]
-    for t in terms:
-        elements.append(Paragraph(t, ParagraphStyle('term', parent=normal, fontSize=8)))
-    elements.append(Spacer(1, 12 * mm))
-
-    # ── Signature ────────────────────────────────────────────────────────
-    sig_data = [['', Paragraph('<b>For KVM ENTERPRISES</b>', right)],
-                ['', ''],
-                ['', Paragraph('Authorized Signatory', right)]]
-    sig_table = Table(sig_data, colWidths=[doc.width * 0.6, doc.width * 0.4])
-    elements.append(sig_table)
+    # ── Terms & signature ────────────────────────────────────────────────
+    elements.extend(t.terms())
+    elements.append(t.signature())
 
     doc.build(elements)
-    buf.seek(0)
-    return buf
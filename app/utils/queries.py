@@ -0,0 +1,95 @@
+"""Eager-loading query builders, one per serializer shape.
+
+Each ``to_dict()`` in app/models.py walks a fixed set of relationships.
+The builders below load exactly those relationships up front so a list
+endpoint costs a constant number of queries instead of one per row:
+many-to-one / one-to-one links are joined into the main SELECT and
+one-to-many collections are fetched with a single extra IN query.
+"""
+from app import db
+from app.models import Product, Customer, Invoice
+from app.utils.pagination import parse_date_range, decode_cursor
+
+
+def product_options():
+    """Loader options matching ``Product.to_dict()``.
+
+    Brand, variant and size come from the in-process catalog
+    (app.utils.catalog) passed to ``to_dict()``, so only the inventory
+    row is loaded.
+    """
+    return (db.joinedload(Product.inventory),)
+
+
+def invoice_options(include_items=True):
+    """Loader options matching ``Invoice.to_dict(include_items=...)``."""
+    opts = [db.joinedload(Invoice.customer)]
+    if include_items:
+        opts.append(db.selectinload(Invoice.items))
+    return tuple(opts)
+
+
+def product_query():
+    return Product.query.options(*product_options())
+
+
+def inventory_query():
+    """Products with their inventory row, shaped for the inventory listing.
+
+    The related tables are joined explicitly (rather than joinedload'ed
+    under anonymous aliases) so callers can filter and sort on them, and
+    ``to_dict()`` reads them from the same row without the catalog.
+    """
+    return (Product.query
+            .join(Product.inventory)
+            .join(Product.brand)
+            .join(Product.variant)
+            .join(Product.size)
+            .options(db.contains_eager(Product.inventory),
+                     db.contains_eager(Product.brand),
+                     db.contains_eager(Product.variant),
+                     db.contains_eager(Product.size)))
+
+
+def invoice_query(include_items=True):
+    return Invoice.query.options(*invoice_options(include_items))
+
+
+def invoice_export_query():
+    """Invoices with customer and items in a single joined SELECT."""
+    return Invoice.query.options(db.joinedload(Invoice.customer),
+                                 db.joinedload(Invoice.items))
+
+
+def filter_invoices(query, args):
+    """Apply the list filters shared by the invoice endpoints."""
+    if args.get('status'):
+        query = query.filter(Invoice.status.in_(args['status'].split(',')))
+    if args.get('customer_id'):
+        query = query.filter(Invoice.customer_id == args['customer_id'])
+    if args.get('customer'):
+        # A subquery rather than a join: callers may have joined customers already
+        names = db.select(Customer.id).where(
+            Customer.name.istartswith(args['customer'].strip(), autoescape=True))
+        query = query.filter(Invoice.customer_id.in_(names))
+    if args.get('q'):
+        query = query.filter(Invoice.invoice_number.startswith(args['q'].strip(), autoescape=True))
+    start, end = parse_date_range(args)
+    if start:
+        query = query.filter(Invoice.invoice_date >= start)
+    if end:
+        query = query.filter(Invoice.invoice_date < end)
+    return query
+
+
+def invoices_after(query, cursor):
+    """Keyset filter: invoices after ``cursor`` in newest-first order."""
+    ts, last_id = decode_cursor(cursor)
+    return query.filter(db.or_(
+        Invoice.created_at < ts,
+        db.and_(Invoice.created_at == ts, Invoice.id < last_id),
+    ))
+
+
+def newest_first():
+    return Invoice.created_at.desc(), Invoice.id.desc()
@@ -0,0 +1,111 @@
+"""Per-request SQL statement counting and query budgets.
+
+``count_queries()`` counts every statement the engine executes while the
+block is active; ``query_budget(n)`` wraps a view with it and complains
+when the view issues more than ``n`` statements. Under TESTING the
+complaint is an exception so tests can pin endpoint query counts;
+otherwise it is a logged warning.
+
+Statements run inside ``exempt()`` are not counted: the process-wide
+caches (app.utils.versions, app.utils.catalog) refresh themselves in
+whichever request happens to find them stale, and that cost belongs to
+no view in particular.
+"""
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+
+def _active_counters():
+    if not hasattr(_local, 'counters'):
+        _local.counters = []
+    return _local.counters
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'exempt', 0):
+        return
+    for counter in _active_counters():
+        counter.count += 1
+        counter.statements.append(statement)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    counters = _active_counters()
+    counters.append(counter)
+    try:
+        yield counter
+    finally:
+        counters.remove(counter)
+
+
+@contextmanager
+def exempt():
+    """Leave the statements run inside the block out of every count."""
+    _local.exempt = getattr(_local, 'exempt', 0) + 1
+    try:
+        yield
+    finally:
+        _local.exempt -= 1
+
+
+def query_budget(limit):
+    """Decorator: the wrapped view may run at most ``limit`` statements."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with count_queries() as counter:
+                response = view(*args, **kwargs)
+            if counter.count > limit:
+                msg = (f'{view.__name__} ran {counter.count} queries '
+                       f'(budget {limit})')
+                if current_app.config.get('TESTING'):
+                    raise QueryBudgetExceeded(msg + ':\n' + '\n'.join(counter.statements))
+                current_app.logger.warning(msg)
+            return response
+        return wrapper
+    return decorator
+
+
+def init_query_guard(app):
+    """Count queries for every request and report them in X-Query-Count."""
+    if not app.config.get('QUERY_COUNT_HEADER'):
+        return
+
+    @app.before_request
+    def _start_counting():
+        g._query_counter_cm = count_queries()
+        g.query_counter = g._query_counter_cm.__enter__()
+
+    @app.teardown_request
+    def _stop_counting(exc=None):
+        cm = g.pop('_query_counter_cm', None)
+        if cm is not None:
+            cm.__exit__(None, None, None)
+
+    @app.after_request
+    def _report_count(response):
+        counter = g.get('query_counter')
+        if counter is not None:
+            response.headers['X-Query-Count'] = str(counter.count)
+        return response
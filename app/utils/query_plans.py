@@ -0,0 +1,116 @@
+"""EXPLAIN checks for the hot queries (``flask check-query-plans``).
+
+Each entry in ``hot_queries()`` is built with the same helpers the
+endpoints use, so a filter that stops matching an index shows up here.
+On SQLite the plan comes from ``EXPLAIN QUERY PLAN``; on PostgreSQL
+sequential scans are disabled for the EXPLAIN so the planner picks an
+index whenever one applies, even on tiny tables, and any ``Seq Scan``
+left in the plan means there is none.
+"""
+import json
+from datetime import date, datetime
+
+from app import db
+from app.models import Product, Invoice, InvoiceItem
+from app.utils.queries import filter_invoices, invoices_after, newest_first
+from app.utils.pagination import encode_cursor
+from app.utils.stats import today_range
+from app.utils import gst_report
+from app.utils import sales
+
+
+PAGE = 50
+
+
+def hot_queries():
+    """[(name, statement, tables that must not be fully scanned)]"""
+    invoices = db.select(Invoice)
+    start, end = today_range()
+    cursor = encode_cursor(datetime.utcnow(), 'x')
+    return [
+        ('invoices: first page',
+         invoices.order_by(*newest_first()).limit(PAGE), ('invoices',)),
+        ('invoices: next page',
+         invoices_after(invoices, cursor).order_by(*newest_first()).limit(PAGE),
+         ('invoices',)),
+        ('invoices: by customer',
+         filter_invoices(invoices, {'customer_id': 'x'}).order_by(*newest_first()).limit(PAGE),
+         ('invoices',)),
+        ('invoices: by status',
+         filter_invoices(invoices, {'status': 'draft'}).order_by(*newest_first()).limit(PAGE),
+         ('invoices',)),
+        ('invoices: date range',
+         filter_invoices(invoices, {'from': '2024-01-01', 'to': '2024-01-31'}),
+         ('invoices',)),
+        ('invoices: issued today',
+         db.select(db.func.count(Invoice.id))
+         .where(Invoice.invoice_date >= start, Invoice.invoice_date < end),
+         ('invoices',)),
+        ('invoice items: for a page',
+         db.select(InvoiceItem).where(InvoiceItem.invoice_id.in_(['x', 'y'])),
+         ('invoice_items',)),
+        ('invoice items: by product',
+         db.select(InvoiceItem.id).where(InvoiceItem.product_id == 'x').limit(1),
+         ('invoice_items',)),
+        ('reports: gst by hsn',
+         gst_report.hsn_summary({'from': '2024-01-01', 'to': '2024-01-31'}),
+         ('invoices', 'invoice_items')),
+        ('reports: gst b2b',
+         gst_report.b2b_summary({'from': '2024-01-01', 'to': '2024-01-31'}),
+         ('invoices', 'invoice_items')),
+        ('sales: trend',
+         sales._filtered(db.select(sales._table.c.day, *sales._sums()), {},
+                         date(2024, 1, 1), date(2025, 1, 1)).group_by(sales._table.c.day),
+         ('sales_daily',)),
+        ('products: active',
+         db.select(Product).where(Product.is_active.is_(True)), ('products',)),
+        ('products: brand, active',
+         db.select(Product).where(Product.brand_id == 'x', Product.is_active.is_(True)),
+         ('products',)),
+    ]
+
+
+def _sql(stmt):
+    return str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _sqlite_scans(conn, sql):
+    lines, scanned = [], set()
+    for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql):
+        detail = row[-1]
+        lines.append(detail)
+        words = detail.split()
+        # "SCAN t" reads every row; "SCAN t USING INDEX ix" walks an index
+        # in order (ORDER BY ... LIMIT) and "SEARCH t ..." seeks.
+        if words[0] == 'SCAN' and 'USING' not in words:
+            scanned.add(words[1])
+    return lines, scanned
+
+
+def _postgres_scans(conn, sql):
+    conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + sql).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    lines, scanned = [], set()
+    stack = [(plan[0]['Plan'], 0)]
+    while stack:
+        node, depth = stack.pop()
+        relation = node.get('Relation Name')
+        lines.append('  ' * depth + node['Node Type'] + (f' on {relation}' if relation else ''))
+        if node['Node Type'] == 'Seq Scan':
+            scanned.add(relation)
+        stack.extend((child, depth + 1) for child in reversed(node.get('Plans', [])))
+    return lines, scanned
+
+
+def check():
+    """[(name, plan lines, full-scanned hot tables)] for every hot query."""
+    explain = _postgres_scans if db.engine.dialect.name == 'postgresql' else _sqlite_scans
+    results = []
+    with db.engine.connect() as conn:
+        for name, stmt, tables in hot_queries():
+            with conn.begin():
+                lines, scanned = explain(conn, _sql(stmt))
+            results.append((name, lines, sorted(scanned & set(tables))))
+    return results
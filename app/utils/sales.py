@@ -0,0 +1,364 @@
+"""Daily sales rollup (``sales_daily``) and the analytics read from it.
+
+One row per (day, product, customer) holds the number of invoice lines,
+the quantity, taxable value, tax and total of the invoices issued that
+day, cancelled ones excluded. Like the dashboard counters
+(app.utils.counters) the rows are kept current by the write handlers:
+each works out what an invoice contributed before and after the change
+and adds the difference in the same transaction. Trends and top-N lists
+then read rollup rows only, however many invoice lines there are. As
+with the counters each key is spread over COUNTER_SLOTS ``slot`` rows,
+written at random and summed on read, so concurrent invoices for the
+same product and customer on the same day seldom lock the same row.
+
+``rebuild()`` recomputes a range of days from the invoice lines with a
+single INSERT ... SELECT; run it with ``flask backfill-sales``.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import SalesDaily, Invoice, InvoiceItem, Product, Customer
+from app.utils import catalog, counters
+from app.utils.pagination import parse_date_range
+
+
+FIELDS = ('lines', 'quantity', 'taxable', 'tax', 'total')
+KEY_COLUMNS = ('day', 'product_id', 'customer_id')
+# Invoice line values a contribution is built from
+LINE_FIELDS = ('product_id', 'quantity', 'taxable_amount',
+               'cgst_amount', 'sgst_amount', 'igst_amount', 'total')
+
+INTERVALS = ('day', 'month')
+TOP_BY = ('product', 'customer')
+METRICS = ('total', 'taxable', 'tax', 'quantity', 'lines')
+DEFAULT_TOP = 10
+MAX_TOP = 100
+DEFAULT_MAX_POINTS = 400
+
+_table = SalesDaily.__table__
+
+# Query-string parameter -> rollup column
+DIMENSIONS = {
+    'brand': _table.c.brand_id,
+    'product_id': _table.c.product_id,
+    'customer_id': _table.c.customer_id,
+}
+
+
+# ─────────────────────────── Contributions ───────────────────────────────────
+
+def lines_contribution(invoice_date, customer_id, lines, products=None):
+    """Rollup deltas of one invoice's lines, given as mappings of LINE_FIELDS.
+
+    Keys are ``(day, product_id, customer_id, brand_id, field)`` so the
+    result combines with counters.diff() / negate() like a counter
+    contribution. ``products`` (id → product) is looked up in the catalog
+    when the caller has none at hand.
+    """
+    lines = list(lines)
+    if products is None:
+        products = catalog.products_by_id(line['product_id'] for line in lines)
+    day = invoice_date.date()
+    c = Counter()
+    for line in lines:
+        product = products.get(line['product_id'])
+        key = (day, line['product_id'], customer_id, product.brand_id if product else '')
+        c[key + ('lines',)] += 1
+        c[key + ('quantity',)] += line['quantity']
+        c[key + ('taxable',)] += line['taxable_amount']
+        c[key + ('tax',)] += line['cgst_amount'] + line['sgst_amount'] + line['igst_amount']
+        c[key + ('total',)] += line['total']
+    return c
+
+
+def invoice_contribution(invoice, snapshot=None):
+    """Rollup deltas of a stored invoice; nothing once it is cancelled."""
+    if invoice.status == 'cancelled' or invoice.invoice_date is None:
+        return Counter()
+    lines = [{f: getattr(i, f) for f in LINE_FIELDS} for i in invoice.items]
+    products = catalog.products_by_id((line['product_id'] for line in lines), snapshot)
+    return lines_contribution(invoice.invoice_date, invoice.customer_id, lines, products)
+
+
+# ─────────────────────────── Storage ─────────────────────────────────────────
+
+def _update_stmt():
+    key = db.and_(*(_table.c[k] == db.bindparam(f'k_{k}') for k in KEY_COLUMNS + ('slot',)))
+    return _table.update().where(key).values(
+        {f: _table.c[f] + db.bindparam(f'd_{f}') for f in FIELDS})
+
+
+def bump(deltas):
+    """Add ``deltas`` to the rollup rows in the current transaction.
+
+    All rows go to one random slot. Those that exist are updated with
+    one executemany UPDATE and the rest inserted with one executemany
+    INSERT; rows left all zero are deleted. A slot may go negative when
+    an invoice is undone in another slot than it was added to; the sum
+    over the slots is what counts.
+    """
+    rows = {}
+    for (*key, field), delta in deltas.items():
+        if delta:
+            rows.setdefault(tuple(key), dict.fromkeys(FIELDS, 0))[field] = delta
+    if not rows:
+        return
+
+    slot = counters.pick_slot()
+    days = {k[0] for k in rows}
+    existing = set(db.session.execute(
+        db.select(*(_table.c[k] for k in KEY_COLUMNS))
+        .where(_table.c.day.in_(days),
+               _table.c.product_id.in_({k[1] for k in rows}),
+               _table.c.customer_id.in_({k[2] for k in rows}),
+               _table.c.slot == slot)
+    ).all())
+    updates, inserts = [], []
+    for (day, product_id, customer_id, brand_id), values in rows.items():
+        if (day, product_id, customer_id) in existing:
+            updates.append({'k_day': day, 'k_product_id': product_id, 'k_customer_id': customer_id,
+                            'k_slot': slot, **{f'd_{f}': v for f, v in values.items()}})
+        else:
+            inserts.append({'day': day, 'product_id': product_id, 'customer_id': customer_id,
+                            'slot': slot, 'brand_id': brand_id, **values})
+
+    if updates:
+        db.session.execute(_update_stmt(), updates)
+    if inserts:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(_table.insert(), inserts)
+        except IntegrityError:
+            # Another worker created some of these rows first.
+            for row in inserts:
+                _add_row(row)
+    db.session.execute(db.delete(_table).where(
+        _table.c.day.in_(days), _table.c.slot == slot, *(_table.c[f] == 0 for f in FIELDS)))
+
+
+def _add_row(row):
+    params = {f'k_{k}': row[k] for k in KEY_COLUMNS + ('slot',)}
+    params.update({f'd_{f}': row[f] for f in FIELDS})
+    if db.session.execute(_update_stmt(), params).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(_table.insert().values(row))
+    except IntegrityError:
+        db.session.execute(_update_stmt(), params)
+
+
+# ─────────────────────────── Rebuild ─────────────────────────────────────────
+
+def expected_rows(start=None, end=None):
+    """SELECT of the rollup rows recomputed from the invoice lines.
+
+    ``start`` / ``end`` are datetimes bounding ``invoice_date`` (end
+    exclusive), as returned by parse_date_range().
+    """
+    day = db.func.date(Invoice.invoice_date, type_=db.Date)
+    # Lines whose product is gone count under brand '', as in
+    # lines_contribution()
+    brand = db.func.coalesce(Product.brand_id, db.literal_column("''"))
+    stmt = (db.select(
+                day.label('day'),
+                InvoiceItem.product_id,
+                Invoice.customer_id,
+                brand.label('brand_id'),
+                db.func.count(InvoiceItem.id).label('lines'),
+                db.func.sum(InvoiceItem.quantity).label('quantity'),
+                db.func.sum(InvoiceItem.taxable_amount).label('taxable'),
+                db.func.sum(InvoiceItem.cgst_amount + InvoiceItem.sgst_amount
+                            + InvoiceItem.igst_amount).label('tax'),
+                db.func.sum(InvoiceItem.total).label('total'),
+            )
+            .select_from(InvoiceItem)
+            .join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+            .outerjoin(Product, Product.id == InvoiceItem.product_id)
+            .where(Invoice.status != 'cancelled')
+            .group_by(day, InvoiceItem.product_id, Invoice.customer_id, brand))
+    if start:
+        stmt = stmt.where(Invoice.invoice_date >= start)
+    if end:
+        stmt = stmt.where(Invoice.invoice_date < end)
+    return stmt
+
+
+def _in_range(stmt, start, end):
+    if start:
+        stmt = stmt.where(_table.c.day >= start.date())
+    if end:
+        stmt = stmt.where(_table.c.day < end.date())
+    return stmt
+
+
+def rebuild(start=None, end=None):
+    """Replace the rollup rows of days in [start, end) (default: every day)
+    with a fresh computation in slot 0, in one commit. Returns the rows
+    written."""
+    db.session.execute(_in_range(db.delete(_table), start, end))
+    columns = KEY_COLUMNS + ('brand_id',) + FIELDS
+    written = db.session.execute(
+        _table.insert().from_select(columns, expected_rows(start, end))).rowcount
+    db.session.commit()
+    return written
+
+
+def drift(start=None, end=None):
+    """``{(day, product_id, customer_id): (stored, expected)}`` for every
+    rollup row in [start, end) that differs from a fresh computation."""
+    columns = ('brand_id',) + FIELDS
+
+    def by_key(rows):
+        return {tuple(r[k] for k in KEY_COLUMNS): tuple(r[c] for c in columns)
+                for r in (row._mapping for row in rows)}
+
+    keys = [_table.c[k] for k in KEY_COLUMNS + ('brand_id',)]
+    summed = (db.select(*keys, *_sums()).group_by(*keys)
+              # Slots that cancel out leave a key with nothing sold
+              .having(db.or_(*(db.func.sum(_table.c[f]) != 0 for f in FIELDS))))
+    stored = by_key(db.session.execute(_in_range(summed, start, end)))
+    expected = by_key(db.session.execute(expected_rows(start, end)))
+    return {key: (stored.get(key), expected.get(key))
+            for key in set(stored) | set(expected)
+            if stored.get(key) != expected.get(key)}
+
+
+# ─────────────────────────── Analytics ───────────────────────────────────────
+
+def _months_back(day, n):
+    month = day.year * 12 + day.month - 1 - n
+    return day.replace(year=month // 12, month=month % 12 + 1, day=1)
+
+
+def period(args, interval='day'):
+    """[start, end) dates from ?from=&to=.
+
+    Defaults to today (UTC) and, for ``from``, the 30 days or the 12
+    months up to it. Raises ValueError.
+    """
+    start, end = parse_date_range(args)
+    end = end.date() if end else datetime.utcnow().date() + timedelta(days=1)
+    if start:
+        start = start.date()
+    elif interval == 'month':
+        start = _months_back(end - timedelta(days=1), 11)
+    else:
+        start = end - timedelta(days=30)
+    if start >= end:
+        raise ValueError('from must not be after to')
+    return start, end
+
+
+def _filtered(stmt, args, start, end):
+    stmt = stmt.where(_table.c.day >= start, _table.c.day < end)
+    for param, column in DIMENSIONS.items():
+        if args.get(param):
+            stmt = stmt.where(column.in_(args[param].split(',')))
+    return stmt
+
+
+def _sums():
+    return tuple(db.func.sum(_table.c[f]).label(f) for f in FIELDS)
+
+
+def _buckets(start, end, interval):
+    day, seen = start, []
+    while day < end:
+        bucket = day.isoformat() if interval == 'day' else day.strftime('%Y-%m')
+        if not seen or seen[-1] != bucket:
+            seen.append(bucket)
+        day += timedelta(days=1)
+    return seen
+
+
+def _bucket_count(start, end, interval):
+    last = end - timedelta(days=1)
+    if interval == 'day':
+        return (end - start).days
+    return (last.year - start.year) * 12 + last.month - start.month + 1
+
+
+def trend(args):
+    """Sales per day or month of the period, gaps filled with zeros.
+
+    Query params: from, to, interval=day|month, brand, product_id,
+    customer_id (ids, comma-separated). Raises ValueError, also for
+    periods of more than SALES_TREND_MAX_POINTS days or months.
+    """
+    interval = args.get('interval', 'day')
+    if interval not in INTERVALS:
+        raise ValueError(f'interval must be one of: {", ".join(INTERVALS)}')
+    start, end = period(args, interval)
+    limit = current_app.config.get('SALES_TREND_MAX_POINTS', DEFAULT_MAX_POINTS)
+    if _bucket_count(start, end, interval) > limit:
+        raise ValueError(f'Period is longer than {limit} {interval}s; narrow from/to')
+
+    points = {b: dict.fromkeys(FIELDS, 0) for b in _buckets(start, end, interval)}
+    stmt = _filtered(db.select(_table.c.day, *_sums()), args, start, end).group_by(_table.c.day)
+    for row in db.session.execute(stmt):
+        bucket = row.day.isoformat() if interval == 'day' else row.day.strftime('%Y-%m')
+        point = points[bucket]
+        for f in FIELDS:
+            point[f] += getattr(row, f) or 0
+    return {
+        'from': start.isoformat(),
+        'to': (end - timedelta(days=1)).isoformat(),
+        'interval': interval,
+        'points': [{'period': b, **values} for b, values in points.items()],
+    }
+
+
+def top(args):
+    """The best-selling products or customers of the period.
+
+    Query params: from, to, by=product|customer, metric (default total),
+    limit, plus the trend filters. Raises ValueError.
+    """
+    by = args.get('by', 'product')
+    if by not in TOP_BY:
+        raise ValueError(f'by must be one of: {", ".join(TOP_BY)}')
+    metric = args.get('metric', 'total')
+    if metric not in METRICS:
+        raise ValueError(f'metric must be one of: {", ".join(METRICS)}')
+    try:
+        limit = max(1, min(int(args.get('limit', DEFAULT_TOP)), MAX_TOP))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    start, end = period(args)
+
+    key = _table.c.product_id if by == 'product' else _table.c.customer_id
+    sums = _sums()
+    stmt = (_filtered(db.select(key.label('id'), *sums), args, start, end)
+            .group_by(key)
+            .having(sums[0] > 0)
+            .order_by(sums[FIELDS.index(metric)].desc(), key)
+            .limit(limit))
+    rows = db.session.execute(stmt).all()
+
+    ids = [r.id for r in rows]
+    if by == 'product':
+        snap = catalog.get()
+        products = catalog.products_by_id(ids, snap)
+        names = {}
+        for pid, p in products.items():
+            brand = snap.brands.get(p.brand_id)
+            names[pid] = {'name': p.name, 'brand_id': p.brand_id,
+                          'brand': brand.name if brand else None}
+    else:
+        names = {c.id: {'name': c.name, 'gstin': c.gstin}
+                 for c in db.session.execute(
+                     db.select(Customer.id, Customer.name, Customer.gstin)
+                     .where(Customer.id.in_(ids)))}
+    return {
+        'from': start.isoformat(),
+        'to': (end - timedelta(days=1)).isoformat(),
+        'by': by,
+        'metric': metric,
+        'items': [{'id': r.id, **names.get(r.id, {'name': None}),
+                   **{f: getattr(r, f) for f in FIELDS}} for r in rows],
+    }
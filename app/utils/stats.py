@@ -0,0 +1,62 @@
+"""From-scratch aggregate queries for the dashboard counters.
+
+Everything is computed in SQL with GROUP BY and conditional SUMs so the
+cost is a fixed two statements however many products or invoices exist.
+app.utils.counters uses these to seed and reconcile the materialized
+counters that /api/dashboard actually reads.
+"""
+from datetime import datetime, time, timedelta
+
+from app import db
+from app.models import Product, Inventory, Invoice
+
+
+def count_if(cond):
+    return db.func.coalesce(db.func.sum(db.case((cond, 1), else_=0)), 0)
+
+
+def sum_if(cond, value):
+    return db.func.coalesce(db.func.sum(db.case((cond, value), else_=0)), 0)
+
+
+def today_range(now=None):
+    """[start, end) datetimes for the current UTC day."""
+    start = datetime.combine((now or datetime.utcnow()).date(), time.min)
+    return start, start + timedelta(days=1)
+
+
+def stock_by_brand():
+    """Stock aggregates per brand_id over every product with an inventory row."""
+    qty = db.func.coalesce(Inventory.quantity, 0)
+    reorder = db.func.coalesce(Inventory.reorder_level, 0)
+    active = Product.is_active.is_(True)
+
+    return (db.session.query(
+                Product.brand_id,
+                db.func.coalesce(db.func.sum(qty * Product.price), 0).label('value'),
+                db.func.coalesce(db.func.sum(qty), 0).label('units'),
+                count_if(qty > 0).label('stocked'),
+                count_if(qty > reorder).label('in_stock'),
+                count_if(db.and_(qty > 0, qty <= reorder)).label('low'),
+                sum_if(db.and_(active, qty > 0), qty).label('b_qty'),
+                count_if(db.and_(active, qty > 0)).label('b_stocked'),
+                count_if(db.and_(active, qty > 0, qty <= reorder)).label('b_low'),
+            )
+            .join(Inventory, Inventory.product_id == Product.id)
+            .group_by(Product.brand_id)
+            .all())
+
+
+def invoice_stats(day=None):
+    start, end = today_range(day)
+    in_today = db.and_(Invoice.invoice_date >= start, Invoice.invoice_date < end)
+    total, revenue, today = db.session.query(
+        db.func.count(Invoice.id),
+        db.func.coalesce(db.func.sum(Invoice.grand_total), 0),
+        count_if(in_today),
+    ).one()
+    return {
+        'today_invoices': int(today),
+        'total_invoices': int(total),
+        'total_revenue': revenue,
+    }
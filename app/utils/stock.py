@@ -0,0 +1,125 @@
+"""Atomic stock movements driven by invoices.
+
+Every movement is one ``UPDATE inventory SET quantity = quantity + CASE
+product_id ... END`` over all products involved, executed in the
+caller's transaction, so concurrent workers never lose each other's
+changes and no Python-side locks are held.
+
+Each invoice records what it currently does to inventory in
+``Invoice.stock_state``:
+
+* ``none``      – nothing (cancelled)
+* ``reserved``  – quantities held in ``Inventory.reserved`` (draft, when
+  STOCK_MODE is ``reserve``)
+* ``committed`` – quantities taken out of ``Inventory.quantity``
+
+Status changes move an invoice between these states and apply the
+difference. Invoices with a NULL state predate stock tracking and are
+left alone.
+"""
+from collections import Counter
+
+from flask import current_app
+
+from app import db
+from app.models import Inventory, Product
+from app.utils import counters
+from app.utils import versions
+
+
+NONE, RESERVED, COMMITTED = 'none', 'reserved', 'committed'
+
+
+class InsufficientStock(Exception):
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(f"{p['name']} (available {p['available']})" for p in products)
+        super().__init__(f'Insufficient stock for {names}')
+
+
+def quantities(items):
+    """{product_id: total quantity} for item dicts or InvoiceItem objects."""
+    totals = Counter()
+    for i in items:
+        if isinstance(i, dict):
+            totals[i['product_id']] += i['quantity']
+        else:
+            totals[i.product_id] += i.quantity or 0
+    return totals
+
+
+def target_state(status):
+    if status == 'cancelled':
+        return NONE
+    if status == 'draft' and current_app.config.get('STOCK_MODE') == 'reserve':
+        return RESERVED
+    return COMMITTED
+
+
+def transition(qty_by_product, from_state, to_state):
+    """Apply the inventory difference between two stock states."""
+    if from_state is None or from_state == to_state:
+        return
+    commit = (to_state == COMMITTED) - (from_state == COMMITTED)
+    reserve = (to_state == RESERVED) - (from_state == RESERVED)
+    adjust(
+        {pid: -q * commit for pid, q in qty_by_product.items()},
+        {pid: q * reserve for pid, q in qty_by_product.items()},
+    )
+
+
+def adjust(quantity_deltas, reserved_deltas=None):
+    """Add signed deltas to inventory quantity/reserved in one UPDATE.
+
+    Raises InsufficientStock, leaving the caller to roll back, when a
+    change lowers a product's available stock (quantity - reserved)
+    below zero and ALLOW_NEGATIVE_STOCK is off.
+    """
+    reserved_deltas = reserved_deltas or {}
+    qd = {pid: d for pid, d in quantity_deltas.items() if d}
+    rd = {pid: d for pid, d in reserved_deltas.items() if d}
+    pids = set(qd) | set(rd)
+    if not pids:
+        return
+
+    table = Inventory.__table__
+    values = {}
+    if qd:
+        values['quantity'] = table.c.quantity + db.case(qd, value=table.c.product_id, else_=0)
+    if rd:
+        values['reserved'] = table.c.reserved + db.case(rd, value=table.c.product_id, else_=0)
+    db.session.execute(table.update().where(table.c.product_id.in_(pids)).values(**values))
+
+    rows = (db.session.query(
+                Inventory.product_id, Inventory.quantity, Inventory.reserved,
+                Inventory.reorder_level, Product.name, Product.brand_id,
+                Product.price, Product.is_active)
+            .join(Product, Product.id == Inventory.product_id)
+            .filter(Inventory.product_id.in_(pids))
+            .all())
+
+    deltas = Counter()
+    short = []
+    found = set()
+    for r in rows:
+        found.add(r.product_id)
+        dq = qd.get(r.product_id, 0)
+        before = counters.row_contribution(r.brand_id, r.price, r.is_active,
+                                           r.quantity - dq, r.reorder_level)
+        after = counters.row_contribution(r.brand_id, r.price, r.is_active,
+                                          r.quantity, r.reorder_level)
+        deltas.update(counters.diff(before, after))
+        available = (r.quantity or 0) - (r.reserved or 0)
+        if available < 0 and dq - rd.get(r.product_id, 0) < 0:
+            short.append({'product_id': r.product_id, 'name': r.name,
+                          'available': available - dq + rd.get(r.product_id, 0)})
+    # Products without an inventory row have nothing to take from.
+    for pid in pids - found:
+        if qd.get(pid, 0) - rd.get(pid, 0) < 0:
+            short.append({'product_id': pid, 'name': pid, 'available': 0})
+
+    if short and not current_app.config.get('ALLOW_NEGATIVE_STOCK'):
+        raise InsufficientStock(short)
+    counters.bump(deltas)
+    # Every invoice gets here: keep the version row out of its transaction
+    versions.bump_after_commit('inventory')
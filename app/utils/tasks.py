@@ -0,0 +1,43 @@
+"""Handlers for background jobs, see app.utils.jobs."""
+import os
+
+from flask import current_app
+
+from app.utils.jobs import task
+from app.utils.queries import invoice_query
+from app.utils.pdf_generator import generate_invoice_pdf
+from app.utils.inventory_import import open_csv, import_inventory
+from app.utils import pdf_cache
+from app.utils import pdf_export
+
+
+@task('invoice_pdf')
+def invoice_pdf(ctx, invoice_id):
+    invoice = invoice_query().filter_by(id=invoice_id).first()
+    if invoice is None:
+        raise ValueError('Invoice not found')
+    pdf = generate_invoice_pdf(invoice)
+    if pdf_cache.enabled():
+        pdf_cache.put(invoice.id, pdf_cache.content_hash(invoice), pdf)
+    return ctx.save([pdf.getvalue()], f'{invoice.invoice_number}.pdf', 'application/pdf')
+
+
+@task('invoice_export')
+def invoice_export(ctx, fmt, filters):
+    snapshots = pdf_export.load_snapshots(filters)
+    if not snapshots:
+        raise ValueError('No invoices match')
+    ctx.progress(0, len(snapshots))
+    workers = current_app.config.get('PDF_EXPORT_WORKERS') or pdf_export.default_workers()
+    body = pdf_export.stream(snapshots, fmt, workers, progress=ctx.progress)
+    return ctx.save(body, pdf_export.filename(filters, fmt), pdf_export.MIMETYPES[fmt])
+
+
+@task('inventory_import')
+def inventory_import(ctx, file):
+    path = ctx.input_path(file)
+    try:
+        with open(path, 'rb') as fh:
+            return import_inventory(open_csv(fh)).to_dict()
+    finally:
+        os.remove(path)
@@ -0,0 +1,146 @@
+"""GST engine: HSN rates, place of supply and line tax computation.
+
+Each line is taxed at the rate of its HSN code from the ``hsn_rates``
+table. Supplies within the company's state (the first two digits of its
+GSTIN) split that rate equally into CGST and SGST; supplies to another
+state are charged IGST at the full rate. The place of supply is the
+state code in the customer's GSTIN, or their state name, and defaults to
+the company's own state.
+
+The rate table is held in memory per worker and re-read when its
+``table_versions`` row moves (app.utils.versions).
+
+``TAX_ROUNDING`` picks where tax is rounded:
+
+``line``
+    each line's tax is rounded and the invoice totals are the sums of
+    the lines;
+``invoice``
+    the tax on each invoice's taxable value at each rate is rounded
+    once and spread over those lines, so they still add up to the
+    header.
+"""
+from flask import current_app
+
+from app import db
+from app.models import HsnRate
+from app.utils import versions
+from app.utils.money import ZERO, to_decimal, round_paise, spread
+
+
+COMPANY_GSTIN = '33EFMPS7293G1ZT'
+HOME_STATE = COMPANY_GSTIN[:2]
+
+RATE_TABLES = ('hsn_rates',)
+
+ROUND_PER_LINE = 'line'
+ROUND_PER_INVOICE = 'invoice'
+ROUNDING_MODES = (ROUND_PER_LINE, ROUND_PER_INVOICE)
+
+# GST state codes
+STATES = {
+    '01': 'Jammu and Kashmir', '02': 'Himachal Pradesh', '03': 'Punjab',
+    '04': 'Chandigarh', '05': 'Uttarakhand', '06': 'Haryana', '07': 'Delhi',
+    '08': 'Rajasthan', '09': 'Uttar Pradesh', '10': 'Bihar', '11': 'Sikkim',
+    '12': 'Arunachal Pradesh', '13': 'Nagaland', '14': 'Manipur', '15': 'Mizoram',
+    '16': 'Tripura', '17': 'Meghalaya', '18': 'Assam', '19': 'West Bengal',
+    '20': 'Jharkhand', '21': 'Odisha', '22': 'Chhattisgarh', '23': 'Madhya Pradesh',
+    '24': 'Gujarat', '26': 'Dadra and Nagar Haveli and Daman and Diu',
+    '27': 'Maharashtra', '29': 'Karnataka', '30': 'Goa', '31': 'Lakshadweep',
+    '32': 'Kerala', '33': 'Tamil Nadu', '34': 'Puducherry',
+    '35': 'Andaman and Nicobar Islands', '36': 'Telangana', '37': 'Andhra Pradesh',
+    '38': 'Ladakh', '97': 'Other Territory',
+}
+STATE_CODES = {name.lower(): code for code, name in STATES.items()}
+STATE_CODES.update({
+    'orissa': '21', 'pondicherry': '34', 'uttaranchal': '05', 'new delhi': '07',
+    'tn': '33',
+})
+
+_rates = [None, {}]  # [version, {hsn_code: rate}]
+
+
+# ─────────────────────────── Place of supply ─────────────────────────────────
+
+def place_of_supply(gstin=None, state=None):
+    """GST state code for a customer: GSTIN prefix, else state name or code."""
+    gstin = (gstin or '').strip()
+    if len(gstin) == 15 and gstin[:2] in STATES:
+        return gstin[:2]
+    state = (state or '').strip()
+    if state in STATES:
+        return state
+    return STATE_CODES.get(state.lower(), HOME_STATE)
+
+
+def is_interstate(place):
+    """True when ``place`` is outside the company's state (None counts as home)."""
+    return bool(place) and place != HOME_STATE
+
+
+# ─────────────────────────── Rates ───────────────────────────────────────────
+
+def rates():
+    """{hsn_code: total GST rate %}, from the per-worker cache."""
+    version = versions.current(RATE_TABLES)
+    if _rates[0] != version:
+        table = dict(db.session.execute(db.select(HsnRate.hsn_code, HsnRate.rate)).all())
+        _rates[:] = [version, table]
+    return _rates[1]
+
+
+def rate_for(hsn_code, table=None):
+    """GST rate % for ``hsn_code``; DEFAULT_GST_RATE when it is not in the table.
+
+    Raises ValueError for an unknown code when there is no default.
+    """
+    table = rates() if table is None else table
+    rate = table.get((hsn_code or '').strip())
+    if rate is None:
+        default = current_app.config.get('DEFAULT_GST_RATE')
+        if default in (None, ''):
+            raise ValueError(f'No GST rate for HSN {hsn_code!r}')
+        rate = to_decimal(default)
+    return rate
+
+
+# ─────────────────────────── Computation ─────────────────────────────────────
+
+def _tax(taxable, percents, groups, rounding):
+    raw = [t * p / 100 for t, p in zip(taxable, percents)]
+    if rounding == ROUND_PER_LINE:
+        return [round_paise(r) for r in raw]
+    lines_by_key = {}
+    for n, key in enumerate(zip(groups, percents)):
+        lines_by_key.setdefault(key, []).append(n)
+    tax = [ZERO] * len(raw)
+    for lines in lines_by_key.values():
+        share = [raw[n] for n in lines]
+        for n, amount in zip(lines, spread(share, round_paise(sum(share, ZERO)))):
+            tax[n] = amount
+    return tax
+
+
+def compute_lines(quantities, prices, discounts, rates, interstate,
+                  groups=None, rounding=ROUND_PER_LINE):
+    """Column-wise GST computation for any number of lines.
+
+    Takes parallel sequences (``interstate`` holds one bool per line)
+    and returns parallel lists (taxable, cgst, sgst, igst, total) of
+    paise amounts. ``groups`` names each line's invoice when lines of
+    several invoices are computed together; it only matters for
+    per-invoice rounding (default: one invoice).
+    """
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f'Unknown tax rounding {rounding!r}')
+    if groups is None:
+        groups = [0] * len(quantities)
+    taxable = [round_paise(q * p * (100 - d) / 100)
+               for q, p, d in zip(quantities, prices, discounts)]
+    half = [ZERO if inter else r / 2 for r, inter in zip(rates, interstate)]
+    full = [r if inter else ZERO for r, inter in zip(rates, interstate)]
+    cgst = _tax(taxable, half, groups, rounding)
+    sgst = list(cgst)
+    igst = _tax(taxable, full, groups, rounding)
+    total = [t + c + s + i for t, c, s, i in zip(taxable, cgst, sgst, igst)]
+    return taxable, cgst, sgst, igst, total
@@ -0,0 +1,127 @@
+"""Per-table data versions and cached JSON responses with strong ETags.
+
+Every handler that writes brands, products, inventory or customers calls
+``bump()`` for the tables it touched, in the same transaction as the
+write, so the ``table_versions`` row moves exactly when the data does.
+A reference-data GET is answered by ``cached_json()``: it reads the
+versions of the tables the response is built from, and as long as they
+have not moved it serves the serialized body kept in process memory
+(or a 304 when the client's If-None-Match matches) without querying or
+serializing the data itself.
+
+Invoices move inventory on every write, so their ``inventory`` bump goes
+through ``bump_after_commit()`` instead: it runs in a short transaction
+of its own once the invoice has committed, rather than holding the one
+``table_versions`` row locked for the whole invoice transaction.
+
+Versions are read from the database at most every REFERENCE_CACHE_TTL
+seconds per process, so other workers' writes show up within that
+window; a worker's own writes are seen as soon as they commit.
+"""
+import hashlib
+import threading
+import time
+
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import TableVersion
+from app.utils import fast_json, query_guard
+
+
+_lock = threading.Lock()
+_versions = {}    # table -> version, as last read from the database
+_read_at = [0.0]  # monotonic time of that read
+_responses = {}   # key -> (versions, etag, body)
+
+
+def bump(*tables):
+    """Advance the version of ``tables`` in the current transaction."""
+    _advance(db.session, tables)
+    db.session().info['versions_bumped'] = True
+
+
+def bump_after_commit(*tables):
+    """Advance the version of ``tables`` once the current transaction has
+    committed, in a transaction of its own; nothing if it rolls back."""
+    db.session().info.setdefault('bump_after_commit', set()).update(tables)
+
+
+def _advance(conn, tables):
+    """Bump ``tables`` through ``conn``, a Session or a Connection."""
+    for name in sorted(tables):
+        stmt = (db.update(TableVersion).where(TableVersion.name == name)
+                .values(version=TableVersion.version + 1))
+        if conn.execute(stmt).rowcount:
+            continue
+        try:
+            with conn.begin_nested():
+                conn.execute(db.insert(TableVersion).values(name=name, version=1))
+        except IntegrityError:
+            # Another worker created the row between our UPDATE and INSERT.
+            conn.execute(stmt)
+
+
+@event.listens_for(Session, 'after_commit')
+def _on_commit(session):
+    if session.in_nested_transaction():
+        return  # a SAVEPOINT was released; the transaction goes on
+    bumped = session.info.pop('versions_bumped', False)
+    tables = session.info.pop('bump_after_commit', None)
+    if tables:
+        with db.engine.begin() as conn:
+            _advance(conn, tables)
+    if bumped or tables:
+        _forget()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    if session.in_nested_transaction():
+        return  # only the SAVEPOINT was rolled back
+    session.info.pop('versions_bumped', None)
+    session.info.pop('bump_after_commit', None)
+
+
+def _forget():
+    with _lock:
+        _read_at[0] = 0.0
+
+
+def current(tables, fresh=False):
+    """Versions of ``tables`` as a tuple, re-read at most every TTL seconds."""
+    ttl = current_app.config.get('REFERENCE_CACHE_TTL', 2)
+    with _lock:
+        recent = time.monotonic() - _read_at[0] < ttl
+        if recent and not fresh:
+            return tuple(_versions.get(t, 0) for t in tables)
+    with query_guard.exempt():
+        rows = db.session.execute(db.select(TableVersion.name, TableVersion.version)).all()
+    with _lock:
+        _versions.clear()
+        _versions.update(rows)
+        _read_at[0] = time.monotonic()
+        return tuple(_versions.get(t, 0) for t in tables)
+
+
+def cached_json(key, tables, build):
+    """Respond with ``build()`` as JSON, cached until ``tables`` change."""
+    versions = current(tables)
+    entry = _responses.get(key)
+    if entry is None or entry[0] != versions:
+        body = fast_json.dumps(build())
+        entry = (versions, hashlib.sha256(body).hexdigest()[:32], body)
+        _responses[key] = entry
+    _, etag, body = entry
+
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Per-user data: let the browser keep it but always revalidate
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
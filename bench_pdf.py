@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for invoice PDF rendering.
+
+Compares renders/sec for 1-, 20- and 500-line invoices when the layout
+template is rebuilt on every render (the old behaviour) against the
+shared per-process template. No database is needed.
+
+    python bench_pdf.py [--seconds 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.pdf_generator import generate_invoice_pdf, InvoiceTemplate, get_template
+
+
+def make_invoice(lines):
+    items = [SimpleNamespace(
+        product_name=f'Finolex 4kg {4 + n % 9}" Pipe', hsn_code='3917',
+        quantity=n + 1, unit_price=125.5, discount_percent=2.5,
+        taxable_amount=122.36 * (n + 1), cgst_amount=11.01 * (n + 1),
+        sgst_amount=11.01 * (n + 1), total=144.38 * (n + 1),
+    ) for n in range(lines)]
+    return SimpleNamespace(
+        invoice_number='KVM-20250101-0001', invoice_date=datetime(2025, 1, 1),
+        status='sent', notes='Benchmark invoice',
+        subtotal=sum(i.taxable_amount for i in items),
+        cgst_total=sum(i.cgst_amount for i in items),
+        sgst_total=sum(i.sgst_amount for i in items),
+        grand_total=sum(i.total for i in items),
+        customer=SimpleNamespace(name='Acme Builders', address='12 Main Road',
+                                 city='Chennai', state='Tamil Nadu', pincode='600026',
+                                 gstin='33ABCDE1234F1Z5', phone='9000000000'),
+        items=items,
+    )
+
+
+def renders_per_sec(render, seconds):
+    render()  # warm up
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        render()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help='time per measurement')
+    args = parser.parse_args()
+
+    get_template()
+    print(f"{'lines':>6} {'rebuilt/s':>10} {'shared/s':>10} {'speedup':>8}")
+    for lines in (1, 20, 500):
+        invoice = make_invoice(lines)
+        before = renders_per_sec(
+            lambda: generate_invoice_pdf(invoice, template=InvoiceTemplate()), args.seconds)
+        after = renders_per_sec(lambda: generate_invoice_pdf(invoice), args.seconds)
+        print(f"{lines:>6} {before:>10.1f} {after:>10.1f} {after / before:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
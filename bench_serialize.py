@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Microbenchmark for the product and invoice list serializers.
+
+Compares rows/sec for GET /api/products and GET /api/invoices between the
+ORM path (query with eager loading, ``to_dict()``, Flask's JSON encoder)
+and app.utils.fast_json (Core tuples + orjson or stdlib json). A
+throwaway SQLite database is seeded with extra brands and invoices.
+
+    python bench_serialize.py [--seconds 3] [--invoices 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(app, n_brands, n_invoices):
+    from app import db
+    from app.models import (
+        Brand, Variant, Size, Product, Inventory, Customer, Invoice, InvoiceItem, gen_uuid,
+    )
+    with app.app_context():
+        variants, sizes = Variant.query.all(), Size.query.all()
+        for b in range(n_brands):
+            brand = Brand(id=gen_uuid(), name=f'Bench {b}', code=f'B{b:03d}')
+            db.session.add(brand)
+            for v in variants:
+                for s in sizes:
+                    p = Product(id=gen_uuid(), name=f'Bench {b} {v.name} {s.size_inches}',
+                                brand_id=brand.id, variant_id=v.id, size_id=s.id, price=100)
+                    db.session.add(p)
+                    db.session.add(Inventory(product_id=p.id, quantity=50, reorder_level=10))
+        db.session.flush()
+        products = Product.query.limit(20).all()
+        customers = [Customer(id=gen_uuid(), name=f'Customer {i}', city='Chennai') for i in range(50)]
+        db.session.add_all(customers)
+        for i in range(n_invoices):
+            inv = Invoice(id=gen_uuid(), invoice_number=f'BENCH-{i:06d}',
+                          customer_id=customers[i % 50].id, grand_total=1180, subtotal=1000)
+            db.session.add(inv)
+            for j in range(3):
+                p = products[(i + j) % len(products)]
+                db.session.add(InvoiceItem(invoice_id=inv.id, product_id=p.id,
+                                           product_name=p.name, quantity=1, unit_price=100))
+        db.session.commit()
+
+
+def rows_per_sec(fn, seconds):
+    fn()  # warm up
+    rows = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        rows += fn()
+    return rows / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0, help='time per measurement')
+    parser.add_argument('--brands', type=int, default=20, help='extra brands (18 products each)')
+    parser.add_argument('--invoices', type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + tmp.name
+
+    from flask import jsonify, request
+    from app import create_app
+    from app.utils import catalog, fast_json
+    from app.utils.queries import product_query, invoice_query, newest_first
+
+    app = create_app('production')
+    seed(app, args.brands, args.invoices)
+    page = 200
+
+    def orm_products():
+        rows = product_query().filter_by(is_active=True).all()
+        snapshot = catalog.get()
+        jsonify([p.to_dict(snapshot) for p in rows]).get_data()
+        return len(rows)
+
+    def fast_products():
+        rows = fast_json.products()
+        fast_json.response(rows).get_data()
+        return len(rows)
+
+    def orm_invoices():
+        rows = invoice_query().order_by(*newest_first()).limit(page).all()
+        jsonify({'invoices': [i.to_dict() for i in rows]}).get_data()
+        return len(rows)
+
+    def fast_invoices():
+        rows, _ = fast_json.invoices(request.args, page)
+        fast_json.response({'invoices': rows}).get_data()
+        return len(rows)
+
+    encoder = 'orjson' if fast_json.orjson else 'json'
+    print(f"encoder: {encoder}")
+    print(f"{'endpoint':<16} {'orm rows/s':>11} {'fast rows/s':>12} {'speedup':>8}")
+    with app.test_request_context('/api/invoices'):
+        for name, before, after in (('/api/products', orm_products, fast_products),
+                                    ('/api/invoices', orm_invoices, fast_invoices)):
+            slow = rows_per_sec(before, args.seconds)
+            fast = rows_per_sec(after, args.seconds)
+            print(f"{name:<16} {slow:>11.0f} {fast:>12.0f} {fast / slow:>7.2f}x")
+    os.unlink(tmp.name)
+
+
+if __name__ == '__main__':
+    main()
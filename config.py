@@ -16,12 +16,46 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     JSON_SORT_KEYS = False
+    # Add an X-Query-Count header with the number of SQL statements per request
+    QUERY_COUNT_HEADER = False
+    # Invoice serials reserved per worker at a time; 1 keeps numbering gapless
+    INVOICE_NUMBER_BLOCK = int(os.getenv('INVOICE_NUMBER_BLOCK', '1'))
+    # 'immediate': invoices take stock when created; 'reserve': drafts only
+    # reserve it and stock is taken when the invoice is sent or paid
+    STOCK_MODE = os.getenv('STOCK_MODE', 'immediate')
+    ALLOW_NEGATIVE_STOCK = os.getenv('ALLOW_NEGATIVE_STOCK', 'false').lower() == 'true'
+    # GST rounding: 'line' rounds each line's tax, 'invoice' rounds the
+    # invoice's tax once and spreads it over the lines
+    TAX_ROUNDING = os.getenv('TAX_ROUNDING', 'line')
+    # GST % for HSN codes missing from hsn_rates; empty rejects such lines
+    DEFAULT_GST_RATE = os.getenv('DEFAULT_GST_RATE', '18')
+    # Rendered invoice PDFs; defaults to <instance>/pdf_cache
+    PDF_CACHE_ENABLED = True
+    PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR')
+    PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+    # Longest /api/reports/sales/trend series, in days or months
+    SALES_TREND_MAX_POINTS = int(os.getenv('SALES_TREND_MAX_POINTS', '400'))
+    # Bulk PDF export: render processes (0 = min(4, CPUs); 1 renders inline)
+    PDF_EXPORT_WORKERS = int(os.getenv('PDF_EXPORT_WORKERS', '0'))
+    PDF_EXPORT_MAX_INVOICES = 2000
+    # Rows each dashboard counter and sales rollup row is spread over, so
+    # concurrent invoice writes rarely update the same row
+    COUNTER_SLOTS = int(os.getenv('COUNTER_SLOTS', '8'))
+    # Seconds a worker trusts its copy of table_versions before re-reading
+    REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', '2'))
+    # Background jobs (flask run-jobs); result files default to <instance>/job_results
+    JOB_RESULT_DIR = os.getenv('JOB_RESULT_DIR')
+    JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', '24'))  # hours
+    JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '600'))  # seconds without heartbeat
+    JOB_MAX_ATTEMPTS = 3
+    JOB_POLL_INTERVAL = 1.0
 
 
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     TESTING = False
+    QUERY_COUNT_HEADER = True
 
 
 class ProductionConfig(Config):
@@ -30,8 +64,19 @@ class ProductionConfig(Config):
     TESTING = False
 
 
+class TestingConfig(Config):
+    """Test configuration: query budgets raise instead of logging"""
+    DEBUG = False
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = _fix_db_uri(
+        os.getenv('TEST_DATABASE_URL', 'sqlite:///kvm_inventory_test.db')
+    )
+    PDF_CACHE_ENABLED = False
+
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig,
 }
@@ -13,9 +13,8 @@ def init_db():
     app = create_app(os.getenv('FLASK_ENV', 'development'))
     
     with app.app_context():
-        # Create all tables
-        db.create_all()
-        print("✓ Database tables created")
+        # create_app() has already applied the migrations
+        print("✓ Database schema up to date")
         
         # Create default admin user if not exists
         admin = User.query.filter_by(username='admin').first()
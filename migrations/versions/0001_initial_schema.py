@@ -0,0 +1,147 @@
+"""Initial schema, as created by db.create_all() before migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('password_hash', sa.String(length=256), nullable=False),
+        sa.Column('is_active_user', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username'),
+    )
+    op.create_table(
+        'brands',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('code', sa.String(length=10), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'variants',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('weight_kg', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_table(
+        'sizes',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('size_inches', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('size_inches'),
+    )
+    op.create_table(
+        'customers',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('gstin', sa.String(length=20), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('email', sa.String(length=120), nullable=True),
+        sa.Column('address', sa.Text(), nullable=True),
+        sa.Column('city', sa.String(length=100), nullable=True),
+        sa.Column('state', sa.String(length=100), nullable=True),
+        sa.Column('pincode', sa.String(length=10), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'products',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=200), nullable=False),
+        sa.Column('brand_id', sa.String(length=36), nullable=False),
+        sa.Column('variant_id', sa.String(length=36), nullable=False),
+        sa.Column('size_id', sa.String(length=36), nullable=False),
+        sa.Column('hsn_code', sa.String(length=20), nullable=True),
+        sa.Column('unit', sa.String(length=20), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['brand_id'], ['brands.id']),
+        sa.ForeignKeyConstraint(['size_id'], ['sizes.id']),
+        sa.ForeignKeyConstraint(['variant_id'], ['variants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_table(
+        'inventory',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('product_id', sa.String(length=36), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('reorder_level', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('product_id'),
+    )
+    op.create_table(
+        'invoices',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('invoice_number', sa.String(length=50), nullable=False),
+        sa.Column('customer_id', sa.String(length=36), nullable=False),
+        sa.Column('invoice_date', sa.DateTime(), nullable=True),
+        sa.Column('subtotal', sa.Float(), nullable=True),
+        sa.Column('cgst_total', sa.Float(), nullable=True),
+        sa.Column('sgst_total', sa.Float(), nullable=True),
+        sa.Column('grand_total', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('invoice_number'),
+    )
+    op.create_table(
+        'invoice_items',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('invoice_id', sa.String(length=36), nullable=False),
+        sa.Column('product_id', sa.String(length=36), nullable=False),
+        sa.Column('product_name', sa.String(length=200), nullable=True),
+        sa.Column('hsn_code', sa.String(length=20), nullable=True),
+        sa.Column('quantity', sa.Integer(), nullable=True),
+        sa.Column('unit_price', sa.Float(), nullable=True),
+        sa.Column('discount_percent', sa.Float(), nullable=True),
+        sa.Column('taxable_amount', sa.Float(), nullable=True),
+        sa.Column('cgst_amount', sa.Float(), nullable=True),
+        sa.Column('sgst_amount', sa.Float(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id']),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('invoice_items')
+    op.drop_table('invoices')
+    op.drop_table('inventory')
+    op.drop_table('products')
+    op.drop_table('customers')
+    op.drop_table('sizes')
+    op.drop_table('variants')
+    op.drop_table('brands')
+    op.drop_table('users')
@@ -0,0 +1,96 @@
+"""Stock tracking, dashboard counters, invoice sequences, jobs, table versions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00
+
+Everything the models gained before migrations existed: inventory.reserved
+and invoices.stock_state (stock movements), stat_counters (dashboard
+counters), invoice_sequences (invoice numbers), jobs and table_versions.
+
+Databases created with db.create_all() by a release that already had some
+of these tables or columns are stamped at 0001, so each step is skipped
+when its table or column is already there.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _columns(table):
+    return {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade():
+    if 'reserved' not in _columns('inventory'):
+        with op.batch_alter_table('inventory') as batch_op:
+            batch_op.add_column(sa.Column('reserved', sa.Integer(), server_default='0', nullable=False))
+    if 'stock_state' not in _columns('invoices'):
+        with op.batch_alter_table('invoices') as batch_op:
+            batch_op.add_column(sa.Column('stock_state', sa.String(length=20), nullable=True))
+
+    tables = _tables()
+    if 'stat_counters' not in tables:
+        op.create_table(
+            'stat_counters',
+            sa.Column('key', sa.String(length=80), nullable=False),
+            sa.Column('value', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('key'),
+        )
+    if 'invoice_sequences' not in tables:
+        op.create_table(
+            'invoice_sequences',
+            sa.Column('day', sa.String(length=8), nullable=False),
+            sa.Column('last_value', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day'),
+        )
+    if 'jobs' not in tables:
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('kind', sa.String(length=40), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('params', sa.Text(), nullable=False),
+            sa.Column('progress', sa.Integer(), nullable=False),
+            sa.Column('total', sa.Integer(), nullable=True),
+            sa.Column('result', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('worker', sa.String(length=80), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_jobs_status', 'jobs', ['status'])
+    if 'table_versions' not in tables:
+        op.create_table(
+            'table_versions',
+            sa.Column('name', sa.String(length=40), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('name'),
+        )
+
+
+def downgrade():
+    op.drop_table('table_versions')
+    op.drop_index('ix_jobs_status', table_name='jobs')
+    op.drop_table('jobs')
+    op.drop_table('invoice_sequences')
+    op.drop_table('stat_counters')
+    with op.batch_alter_table('invoices') as batch_op:
+        batch_op.drop_column('stock_state')
+    with op.batch_alter_table('inventory') as batch_op:
+        batch_op.drop_column('reserved')
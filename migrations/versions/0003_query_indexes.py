@@ -0,0 +1,37 @@
+"""Indexes for the invoice, invoice item and product query patterns
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_invoices_created_at_id', 'invoices', ['created_at', 'id']),
+    ('ix_invoices_invoice_date', 'invoices', ['invoice_date']),
+    ('ix_invoices_customer_id_created_at_id', 'invoices', ['customer_id', 'created_at', 'id']),
+    ('ix_invoices_status_created_at_id', 'invoices', ['status', 'created_at', 'id']),
+    ('ix_invoice_items_invoice_id', 'invoice_items', ['invoice_id']),
+    ('ix_invoice_items_product_id', 'invoice_items', ['product_id']),
+    ('ix_products_brand_id_is_active', 'products', ['brand_id', 'is_active']),
+    ('ix_products_is_active', 'products', ['is_active']),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,49 @@
+"""Store money as Numeric(12, 2) instead of Float
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 10:00:00
+
+Existing values are rounded to paise on the way.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = {
+    'products': (('price', 12),),
+    'invoices': (('subtotal', 12), ('cgst_total', 12), ('sgst_total', 12),
+                 ('grand_total', 12)),
+    'invoice_items': (('unit_price', 12), ('discount_percent', 5), ('taxable_amount', 12),
+                      ('cgst_amount', 12), ('sgst_amount', 12), ('total', 12)),
+    'stat_counters': (('value', 16),),
+}
+
+
+def upgrade():
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for name, precision in columns:
+                batch_op.alter_column(
+                    name, existing_type=sa.Float(), type_=sa.Numeric(precision, 2),
+                    postgresql_using=f'round({name}::numeric, 2)')
+        if op.get_bind().dialect.name != 'postgresql':
+            # No USING clause elsewhere: the copied values keep their
+            # float digits until rounded here.
+            op.execute('UPDATE {} SET {}'.format(
+                table, ', '.join(f'{name} = ROUND({name}, 2)' for name, _ in columns)))
+
+
+def downgrade():
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch_op:
+            for name, precision in columns:
+                batch_op.alter_column(
+                    name, existing_type=sa.Numeric(precision, 2), type_=sa.Float())
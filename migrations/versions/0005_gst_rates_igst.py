@@ -0,0 +1,49 @@
+"""HSN rate table, IGST amounts and place of supply
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 11:00:00
+
+Existing invoice lines were all charged 9% CGST + 9% SGST, so their
+gst_rate is backfilled as 18.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    hsn_rates = op.create_table(
+        'hsn_rates',
+        sa.Column('hsn_code', sa.String(length=20), nullable=False),
+        sa.Column('rate', sa.Numeric(5, 2), nullable=False),
+        sa.Column('description', sa.String(length=200), nullable=True),
+        sa.PrimaryKeyConstraint('hsn_code'),
+    )
+    op.bulk_insert(hsn_rates, [
+        {'hsn_code': '3917', 'rate': 18, 'description': 'Tubes, pipes and hoses of plastics'},
+    ])
+
+    with op.batch_alter_table('invoices') as batch_op:
+        batch_op.add_column(sa.Column('igst_total', sa.Numeric(12, 2), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('place_of_supply', sa.String(length=2), nullable=True))
+    with op.batch_alter_table('invoice_items') as batch_op:
+        batch_op.add_column(sa.Column('gst_rate', sa.Numeric(5, 2), nullable=True))
+        batch_op.add_column(sa.Column('igst_amount', sa.Numeric(12, 2), server_default='0', nullable=False))
+    op.execute('UPDATE invoice_items SET gst_rate = 18')
+
+
+def downgrade():
+    with op.batch_alter_table('invoice_items') as batch_op:
+        batch_op.drop_column('igst_amount')
+        batch_op.drop_column('gst_rate')
+    with op.batch_alter_table('invoices') as batch_op:
+        batch_op.drop_column('place_of_supply')
+        batch_op.drop_column('igst_total')
+    op.drop_table('hsn_rates')
@@ -0,0 +1,50 @@
+"""Daily sales rollup
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00
+
+The table is filled from the existing invoice lines; ``flask
+backfill-sales`` does the same later on.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'sales_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.String(length=36), nullable=False),
+        sa.Column('customer_id', sa.String(length=36), nullable=False),
+        sa.Column('brand_id', sa.String(length=36), nullable=False),
+        sa.Column('lines', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('taxable', sa.Numeric(14, 2), nullable=False),
+        sa.Column('tax', sa.Numeric(14, 2), nullable=False),
+        sa.Column('total', sa.Numeric(14, 2), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'product_id', 'customer_id'),
+    )
+    op.execute("""
+        INSERT INTO sales_daily
+            (day, product_id, customer_id, brand_id, lines, quantity, taxable, tax, total)
+        SELECT date(i.invoice_date), l.product_id, i.customer_id, COALESCE(p.brand_id, ''),
+               count(l.id), sum(l.quantity), sum(l.taxable_amount),
+               sum(l.cgst_amount + l.sgst_amount + l.igst_amount), sum(l.total)
+        FROM invoice_items l
+        JOIN invoices i ON i.id = l.invoice_id
+        LEFT JOIN products p ON p.id = l.product_id
+        WHERE i.status != 'cancelled'
+        GROUP BY date(i.invoice_date), l.product_id, i.customer_id, COALESCE(p.brand_id, '')
+    """)
+
+
+def downgrade():
+    op.drop_table('sales_daily')
@@ -0,0 +1,89 @@
+"""Spread stat_counters and sales_daily rows over slots
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 15:00:00
+
+Adds ``slot`` to the primary key of both tables (see app.utils.counters).
+Existing rows become slot 0. The primary key cannot be altered in place
+on SQLite, so each table is copied into a new one and renamed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def _stat_counter_columns():
+    return [
+        sa.Column('key', sa.String(length=80), nullable=False),
+        sa.Column('slot', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('value', sa.Numeric(16, 2), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ]
+
+
+def _sales_daily_columns():
+    return [
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('product_id', sa.String(length=36), nullable=False),
+        sa.Column('customer_id', sa.String(length=36), nullable=False),
+        sa.Column('slot', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('brand_id', sa.String(length=36), nullable=False),
+        sa.Column('lines', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('taxable', sa.Numeric(14, 2), nullable=False),
+        sa.Column('tax', sa.Numeric(14, 2), nullable=False),
+        sa.Column('total', sa.Numeric(14, 2), nullable=False),
+    ]
+
+
+def _rebuild(table, columns, key, copied):
+    """Recreate ``table`` with ``columns`` and primary key ``key``, keeping
+    the ``copied`` columns of every row."""
+    new = f'{table}_new'
+    op.create_table(new, *columns, sa.PrimaryKeyConstraint(*key, name=f'{new}_pkey'))
+    names = ', '.join(copied)
+    op.execute(f'INSERT INTO {new} ({names}) SELECT {names} FROM {table}')
+    _replace(table, new)
+
+
+def _replace(table, new):
+    op.drop_table(table)
+    op.rename_table(new, table)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {new}_pkey TO {table}_pkey')
+
+
+def upgrade():
+    _rebuild('stat_counters', _stat_counter_columns(), ('key', 'slot'),
+             ('key', 'value', 'updated_at'))
+    _rebuild('sales_daily', _sales_daily_columns(), ('day', 'product_id', 'customer_id', 'slot'),
+             ('day', 'product_id', 'customer_id', 'brand_id',
+              'lines', 'quantity', 'taxable', 'tax', 'total'))
+
+
+def downgrade():
+    # Fold the slots back into one row per key
+    stat_counters = [c for c in _stat_counter_columns() if c.name != 'slot']
+    op.create_table('stat_counters_old', *stat_counters,
+                    sa.PrimaryKeyConstraint('key', name='stat_counters_old_pkey'))
+    op.execute('INSERT INTO stat_counters_old (key, value, updated_at) '
+               'SELECT key, sum(value), max(updated_at) FROM stat_counters GROUP BY key')
+    _replace('stat_counters', 'stat_counters_old')
+
+    sales_daily = [c for c in _sales_daily_columns() if c.name != 'slot']
+    op.create_table('sales_daily_old', *sales_daily,
+                    sa.PrimaryKeyConstraint('day', 'product_id', 'customer_id',
+                                            name='sales_daily_old_pkey'))
+    op.execute('INSERT INTO sales_daily_old '
+               '(day, product_id, customer_id, brand_id, lines, quantity, taxable, tax, total) '
+               'SELECT day, product_id, customer_id, max(brand_id), sum(lines), sum(quantity), '
+               'sum(taxable), sum(tax), sum(total) FROM sales_daily '
+               'GROUP BY day, product_id, customer_id HAVING sum(lines) > 0')
+    _replace('sales_daily', 'sales_daily_old')
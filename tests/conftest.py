@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+import pytest
+
+_tmp = tempfile.mkdtemp(prefix='kvm_test_')
+os.environ.setdefault('TEST_DATABASE_URL', 'sqlite:///' + os.path.join(_tmp, 'test.db'))
+
+from app import create_app, db as _db  # noqa: E402
+from app.models import TableVersion  # noqa: E402
+from app.utils import versions  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    return client
+
+
+@pytest.fixture(scope='session')
+def invoices(app, client):
+    """Two invoices on the first products, stocked first."""
+    products = client.get('/api/products').get_json()[:2]
+    customer = client.post('/api/customers', json={'name': 'Budget Traders'}).get_json()
+    for p in products:
+        client.put(f"/api/inventory/{p['id']}", json={'quantity': 100})
+    items = [{'product_id': p['id'], 'quantity': 2, 'unit_price': '100'} for p in products]
+    return [client.post('/api/invoices', json={'customer_id': customer['id'], 'items': items})
+            .get_json() for _ in range(2)]
+
+
+@pytest.fixture
+def bump_elsewhere(app):
+    """Act like another worker committed a write to every versioned table."""
+    def bump():
+        _db.session.execute(_db.update(TableVersion).values(version=TableVersion.version + 1))
+        _db.session.commit()
+        versions._forget()
+    return bump
@@ -0,0 +1,26 @@
+import pytest
+
+from app.utils import catalog
+
+
+@pytest.fixture
+def get_calls(monkeypatch):
+    calls = []
+    real = catalog.get
+
+    def counting_get(*args, **kwargs):
+        calls.append(args)
+        return real(*args, **kwargs)
+    monkeypatch.setattr(catalog, 'get', counting_get)
+    return calls
+
+
+def test_sales_top_reads_catalog_once(client, invoices, get_calls):
+    assert client.get('/api/reports/sales/top?by=product').status_code == 200
+    assert len(get_calls) == 1
+
+
+def test_status_change_reads_catalog_once(client, invoices, get_calls):
+    url = f"/api/invoices/{invoices[1]['id']}"
+    assert client.put(url, json={'status': 'sent'}).status_code == 200
+    assert len(get_calls) == 1
@@ -0,0 +1,11 @@
+from app.utils import counters, sales
+
+
+def test_slotted_counters_and_rollup_add_up(client, invoices):
+    for invoice in invoices[:1]:
+        assert client.put(f"/api/invoices/{invoice['id']}",
+                          json={'status': 'cancelled'}).status_code == 200
+        assert client.put(f"/api/invoices/{invoice['id']}",
+                          json={'status': 'sent'}).status_code == 200
+    assert counters.reconcile(fix=False) == {}
+    assert sales.drift() == {}
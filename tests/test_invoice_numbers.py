@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from app import db
+from app.models import Customer, Invoice
+from app.utils.invoice_numbers import allocate_invoice_numbers
+
+
+def test_seed_compares_serials_as_integers(app):
+    customer = Customer(name='Serial Traders')
+    db.session.add(customer)
+    db.session.flush()
+    day = datetime(2030, 1, 1)
+    for number in ('KVM-20300101-9999', 'KVM-20300101-10000', 'KVM-20300101-0042'):
+        db.session.add(Invoice(invoice_number=number, customer_id=customer.id, invoice_date=day))
+    db.session.commit()
+
+    assert allocate_invoice_numbers(2, day) == ['KVM-20300101-10001', 'KVM-20300101-10002']
+    db.session.rollback()
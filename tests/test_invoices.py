@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.fixture
+def customer(client):
+    return client.post('/api/customers', json={'name': 'Payload Traders'}).get_json()
+
+
+def test_unknown_product_rejected_by_both_endpoints(client, customer):
+    items = [{'product_id': 'no-such-product', 'quantity': 1, 'unit_price': '10'}]
+    r = client.post('/api/invoices', json={'customer_id': customer['id'], 'items': items})
+    assert r.status_code == 400
+    assert 'no-such-product' in r.get_json()['error']
+
+    r = client.post('/api/invoices/batch',
+                    json={'invoices': [{'customer_id': customer['id'], 'items': items}]})
+    assert r.status_code == 400
+    assert 'no-such-product' in r.get_json()['errors'][0]['error']
+
+
+@pytest.mark.parametrize('items', [[1], ['x'], [None], 'abc'])
+def test_malformed_items_are_a_bad_request(client, customer, items):
+    r = client.post('/api/invoices', json={'customer_id': customer['id'], 'items': items})
+    assert r.status_code == 400
+    r = client.post('/api/invoices/batch',
+                    json={'invoices': [{'customer_id': customer['id'], 'items': items}]})
+    assert r.status_code == 400
@@ -0,0 +1,26 @@
+from app import db
+from app.models import Job, Inventory
+from app.utils import jobs
+
+
+@jobs.task('test_write_then_progress')
+def _write_then_progress(ctx, product_id):
+    db.session.execute(db.update(Inventory).where(Inventory.product_id == product_id)
+                       .values(reorder_level=Inventory.reorder_level + 1))
+    ctx.progress(1, 2)
+    ctx.progress(2, 2)
+    return {'ok': True}
+
+
+def test_progress_while_handler_holds_writes(app):
+    product_id = db.session.execute(db.select(Inventory.product_id).limit(1)).scalar()
+    before = db.session.execute(db.select(Inventory.reorder_level)
+                                .where(Inventory.product_id == product_id)).scalar()
+    job_id = jobs.enqueue('test_write_then_progress', product_id=product_id).id
+    assert jobs.claim('test') == job_id
+
+    assert jobs.run(job_id)
+    job = db.session.get(Job, job_id)
+    assert (job.status, job.progress, job.total) == (jobs.DONE, 2, 2)
+    assert db.session.execute(db.select(Inventory.reorder_level)
+                              .where(Inventory.product_id == product_id)).scalar() == before + 1
@@ -0,0 +1,50 @@
+"""Each budgeted view must stay within its query_budget() whether the
+process-wide caches are warm or have to be refreshed first.
+
+The app runs with TESTING on, so a view over budget raises
+QueryBudgetExceeded and the request fails.
+"""
+import pytest
+
+from app.utils import catalog
+
+
+URLS = [
+    '/api/products',
+    '/api/products?format=columnar',
+    '/api/inventory',
+    '/api/inventory?format=columnar',
+    '/api/invoices',
+    '/api/invoices?view=summary',
+    '/api/reports/sales/trend',
+    '/api/reports/sales/top?by=product',
+    '/api/reports/sales/top?by=customer',
+    '/api/dashboard',
+]
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_budget_with_warm_cache(client, invoices, url):
+    assert client.get(url).status_code == 200
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_budget_after_another_worker_wrote(client, invoices, bump_elsewhere, url):
+    bump_elsewhere()
+    assert client.get(url).status_code == 200
+
+
+@pytest.mark.parametrize('url', URLS)
+def test_budget_with_empty_catalog(client, invoices, url):
+    catalog.invalidate()
+    assert client.get(url).status_code == 200
+
+
+def test_budget_with_version_ttl_zero(app, client, invoices):
+    app.config['REFERENCE_CACHE_TTL'] = 0
+    try:
+        for url in URLS:
+            assert client.get(url).status_code == 200, url
+    finally:
+        app.config['REFERENCE_CACHE_TTL'] = 2
@@ -0,0 +1,26 @@
+from app import db
+from app.utils import versions
+
+
+def test_bump_registers_no_listener_per_call(app):
+    session = db.session()
+    listeners = len(session.dispatch.after_commit)
+    versions.bump('customers')
+    versions.bump('customers', 'brands')
+    assert len(session.dispatch.after_commit) == listeners
+    db.session.commit()
+
+
+def test_rollback_drops_pending_bumps(app):
+    versions.bump('customers')
+    versions.bump_after_commit('inventory')
+    db.session.rollback()
+    assert 'versions_bumped' not in db.session().info
+    assert 'bump_after_commit' not in db.session().info
+
+
+def test_commit_makes_own_bump_visible(app):
+    before = versions.current(('customers',))[0]
+    versions.bump('customers')
+    db.session.commit()
+    assert versions.current(('customers',))[0] == before + 1